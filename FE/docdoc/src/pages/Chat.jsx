@@ -78,6 +78,14 @@ const Bubble = styled.div`
   line-height: 1.5;
 `;
 
+const SourceList = styled.ul`
+  max-width: 70%;
+  margin: 4px 0 0;
+  padding-left: 18px;
+  font-size: 12px;
+  color: #666;
+`;
+
 const InputContainer = styled.div`
   display: flex;
   margin-top: 8px;
@@ -204,6 +212,22 @@ export default function Chat() {
       console.log('스트리밍 시작:', data);
     });
 
+    // 근거 문서 수신 (답변 토큰보다 먼저 도착)
+    socket.on('chat:sources', (data) => {
+      setMessages(prev => {
+        const newMessages = [...prev];
+        let lastMessage = newMessages[newMessages.length - 1];
+        
+        if (!lastMessage || lastMessage.role !== 'assistant') {
+          lastMessage = { role: 'assistant', content: '' };
+          newMessages.push(lastMessage);
+        }
+        
+        lastMessage.sources = data.sources || [];
+        return newMessages;
+      });
+    });
+
     // 스트리밍 토큰 수신
     socket.on('chat:stream_token', (data) => {
       setMessages(prev => {
@@ -391,6 +415,19 @@ export default function Chat() {
                 <Bubble role={m.role}>
                   {m.content}
                 </Bubble>
+                {m.sources && m.sources.length > 0 && (
+                  <SourceList>
+                    {m.sources.map(src => (
+                      <li key={`${src.sourceFile}-${src.page}-${src.chunk}`}>
+                        {src.sourceUrl
+                          ? <a href={src.sourceUrl} target="_blank" rel="noopener noreferrer">{src.title || src.sourceUrl}</a>
+                          : (src.title || src.sourceFile)}
+                        {` · p.${src.page + 1}`}
+                        {src.relevanceScore != null && ` · 관련도 ${src.relevanceScore.toFixed(2)}`}
+                      </li>
+                    ))}
+                  </SourceList>
+                )}
               </MessageItem>
             ))}
           </MessageList>
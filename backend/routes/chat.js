@@ -120,7 +120,7 @@ function handleStreamingToken(clientId, token) {
 }
 
 // 스트리밍 세션 종료
-function endStreamingSession(clientId, finalMessage = null) {
+function endStreamingSession(clientId, finalMessage = null, timings = null, degradations = null) {
     const session = streamingSessions.get(clientId);
     const clientInfo = activeClients.get(clientId);
     
@@ -134,7 +134,9 @@ function endStreamingSession(clientId, finalMessage = null) {
         clientInfo.socket.emit('chat:stream_end', {
             message: fullMessage,
             timestamp: new Date().toISOString(),
-            duration: Date.now() - session.startTime
+            duration: Date.now() - session.startTime,
+            timings: timings,
+            degradations: degradations
         });
         
         // 세션 정리
@@ -188,7 +190,35 @@ function connectToLLMServer() {
                     } else if (response.type === 'stream_end') {
                         console.log('스트리밍 완료:', response.content);
                         // 스트리밍 완료
-                        endStreamingSession(clientId, response.content);
+                        endStreamingSession(clientId, response.content, response.timings, response.degradations);
+                        
+                    } else if (response.type === 'sources') {
+                        // 답변 토큰보다 먼저 도착하는 근거 문서 목록
+                        if (!streamingSessions.has(clientId)) {
+                            startStreamingSession(clientId);
+                        }
+                        clientInfo.socket.emit('chat:sources', {
+                            sources: response.content,
+                            timings: response.timings,
+                            timestamp: new Date().toISOString()
+                        });
+                        
+                    } else if (response.type === 'cancelled') {
+                        // 취소 요청에 대한 확인 (세션 정리는 chat:stop_streaming 처리 시 이미 완료)
+                        console.log(`LLM 서버 답변 생성 취소 확인 - 클라이언트: ${clientId}, 취소됨: ${response.content}`);
+                        
+                    } else if (response.type === 'busy') {
+                        // LLM 서버 입장 제어에 걸림 (동시 처리 한도 초과 또는 질문 빈도 제한)
+                        console.warn(`LLM 서버 busy (${response.reason}) - 클라이언트: ${clientId}, ${response.retryAfter}s 후 재시도`);
+                        clientInfo.socket.emit('chat:error', {
+                            error: `요청이 많아 답변을 시작하지 못했습니다. ${Math.ceil(response.retryAfter || 1)}초 후 다시 시도해주세요.`,
+                            retryAfter: response.retryAfter,
+                            timestamp: new Date().toISOString()
+                        });
+                        
+                        if (streamingSessions.has(clientId)) {
+                            streamingSessions.delete(clientId);
+                        }
                         
                     } else if (response.type === 'error') {
                         console.error('LLM 서버 에러:', response.content);
@@ -276,6 +306,25 @@ function scheduleReconnect() {
     }, RECONNECT_DELAY);
 }
 
+// LLM 서버에 진행 중인 답변 생성 취소 요청 (업스트림 토큰 낭비 방지)
+function cancelLLMRequest(clientId) {
+    if (!llmSocket || llmSocket.readyState !== WebSocket.OPEN) {
+        return false;
+    }
+    
+    try {
+        llmSocket.send(JSON.stringify({
+            type: 'cancel',
+            clientId: clientId,
+            timestamp: new Date().toISOString()
+        }));
+        return true;
+    } catch (error) {
+        console.error('LLM 서버로 취소 요청 전송 실패:', error);
+        return false;
+    }
+}
+
 // LLM 서버에 메시지 전송 (스트리밍 요청)
 function sendToLLMServer(clientId, message) {
     console.log(`LLM 서버로 메시지 전송 시도 - 클라이언트: ${clientId}, 메시지: "${message}"`);
@@ -463,6 +512,7 @@ module.exports = (app, io) => {
                 }
                 
                 streamingSessions.delete(socket.id);
+                cancelLLMRequest(socket.id);
                 
                 socket.emit('chat:stream_stopped', {
                     message: partialMessage,
@@ -475,10 +525,11 @@ module.exports = (app, io) => {
         
         // 클라이언트 연결 해제 처리
         socket.on('disconnect', () => {
-            // 스트리밍 세션 정리
+            // 스트리밍 세션 정리 (LLM 서버의 답변 생성도 취소)
             if (streamingSessions.has(socket.id)) {
                 streamingSessions.delete(socket.id);
             }
+            cancelLLMRequest(socket.id);
             
             activeClients.delete(socket.id);
             console.log(`클라이언트 ${socket.id}가 채팅에서 연결 해제되었습니다.`);
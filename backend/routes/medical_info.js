@@ -2,10 +2,75 @@ const express = require('express');
 const router = express.Router();
 const db = require('../lib/db.connect');
 
+// Idempotency-Key → 처음 응답 (재시도로 같은 요청이 다시 들어와도 한 번만 저장)
+db.query(`
+    CREATE TABLE IF NOT EXISTS medical_info_idempotency (
+        idem_key VARCHAR(128) NOT NULL PRIMARY KEY,
+        response TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+`, (error) => {
+    if (error) console.error('멱등 키 테이블 생성 오류:', error);
+});
+
+/**
+ * 저장 쿼리 실행 (Idempotency-Key가 있으면 키 기록과 한 트랜잭션으로 묶음)
+ * 같은 키가 이미 기록되어 있으면 방금 저장한 행을 롤백하고 처음 응답을 돌려준다.
+ * 같은 키로 동시에 들어온 요청은 기본키 잠금 때문에 먼저 온 트랜잭션이 끝날 때까지 기다린다.
+ * callback(error, data, replayed)
+ */
+function insertOnce(idemKey, query, params, buildData, callback) {
+    if (!idemKey) {
+        return db.query(query, params, (error, results) => {
+            if (error) return callback(error);
+            callback(null, buildData(results), false);
+        });
+    }
+    db.getConnection((connError, conn) => {
+        if (connError) return callback(connError);
+        const fail = (error) => conn.rollback(() => {
+            conn.release();
+            callback(error);
+        });
+        conn.beginTransaction((txError) => {
+            if (txError) {
+                conn.release();
+                return callback(txError);
+            }
+            conn.query(query, params, (error, results) => {
+                if (error) return fail(error);
+                const data = buildData(results);
+                const keyQuery = 'INSERT INTO medical_info_idempotency (idem_key, response) VALUES (?, ?)';
+                conn.query(keyQuery, [idemKey, JSON.stringify(data)], (keyError) => {
+                    if (keyError && keyError.code === 'ER_DUP_ENTRY') {
+                        return conn.rollback(() => {
+                            const replayQuery = 'SELECT response FROM medical_info_idempotency WHERE idem_key = ?';
+                            conn.query(replayQuery, [idemKey], (replayError, rows) => {
+                                conn.release();
+                                if (replayError || rows.length === 0) {
+                                    return callback(replayError || new Error('멱등 키 조회 실패'));
+                                }
+                                callback(null, JSON.parse(rows[0].response), true);
+                            });
+                        });
+                    }
+                    if (keyError) return fail(keyError);
+                    conn.commit((commitError) => {
+                        if (commitError) return fail(commitError);
+                        conn.release();
+                        callback(null, data, false);
+                    });
+                });
+            });
+        });
+    });
+}
+
 module.exports = function(app) {
     /**
      * 의학 정보 저장
      * POST /medical-info
+     * Headers: Idempotency-Key (선택, 같은 키의 재요청은 저장하지 않고 처음 응답 반환)
      * Body: { json: object }
      */
     router.post('/', (req, res) => {
@@ -19,7 +84,11 @@ module.exports = function(app) {
             }
             const jsonString = JSON.stringify(json);
             const query = 'INSERT INTO medical_info (json) VALUES (?)';
-            db.query(query, [jsonString], (error, results) => {
+            const buildData = (results) => ({
+                id: results.insertId,
+                message: '의학 정보가 성공적으로 저장되었습니다.'
+            });
+            insertOnce(req.get('Idempotency-Key'), query, [jsonString], buildData, (error, data, replayed) => {
                 if (error) {
                     console.error('의학 정보 저장 오류:', error);
                     return res.status(500).json({
@@ -27,13 +96,7 @@ module.exports = function(app) {
                         error: '의학 정보 저장 중 오류가 발생했습니다.'
                     });
                 }
-                res.status(201).json({
-                    success: true,
-                    data: {
-                        id: results.insertId,
-                        message: '의학 정보가 성공적으로 저장되었습니다.'
-                    }
-                });
+                res.status(201).json({ success: true, replayed, data });
             });
         } catch (error) {
             console.error('의학 정보 저장 오류:', error);
@@ -44,6 +107,47 @@ module.exports = function(app) {
         }
     });
 
+    /**
+     * 의학 정보 일괄 저장
+     * POST /medical-info/bulk
+     * Headers: Idempotency-Key (선택, 같은 키의 재요청은 저장하지 않고 처음 응답 반환)
+     * Body: { items: [{ json: object }, ...] }
+     */
+    router.post('/bulk', (req, res) => {
+        try {
+            const { items } = req.body;
+            if (!Array.isArray(items) || items.length === 0 || items.some(item => !item || !item.json)) {
+                return res.status(400).json({
+                    success: false,
+                    error: 'items 배열과 각 항목의 json 필드는 필수입니다.'
+                });
+            }
+            const rows = items.map(item => [JSON.stringify(item.json)]);
+            const query = 'INSERT INTO medical_info (json) VALUES ?';
+            const buildData = (results) => ({
+                firstId: results.insertId,
+                count: results.affectedRows,
+                message: '의학 정보가 성공적으로 일괄 저장되었습니다.'
+            });
+            insertOnce(req.get('Idempotency-Key'), query, [rows], buildData, (error, data, replayed) => {
+                if (error) {
+                    console.error('의학 정보 일괄 저장 오류:', error);
+                    return res.status(500).json({
+                        success: false,
+                        error: '의학 정보 일괄 저장 중 오류가 발생했습니다.'
+                    });
+                }
+                res.status(201).json({ success: true, replayed, data });
+            });
+        } catch (error) {
+            console.error('의학 정보 일괄 저장 오류:', error);
+            res.status(500).json({
+                success: false,
+                error: '서버 내부 오류가 발생했습니다.'
+            });
+        }
+    });
+
     /**
      * 의학 정보 최신 5개 조회
      * GET /medical-info
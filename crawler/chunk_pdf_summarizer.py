@@ -4,10 +4,12 @@ chunk_pdf_summarizer.py
 • .env                : UPSTAGE_API_KEY  (PINECONE_API_KEY 선택)
 • ./new_pdfs/urls.txt : 원본 URL (저장된 PDF와 1:1 매핑)
 • ./new_pdfs/*.pdf    : URL을 safe 이름으로 저장한 PDF
-실행 :  python chunk_pdf_summarizer.py
+• ./new_pdfs/.checkpoints/ : PDF별 부분/최종 요약 체크포인트 (재실행 시 이어서 처리)
+• ./new_pdfs/summaries.jsonl : 요약 결과 스풀 (uploader.py 가 읽어 업로드)
+실행 :  python chunk_pdf_summarizer.py [--no-upload] [--bulk]
 ────────────────────────────────────────────────────────────────
 """
-import os, json, re, math
+import os, json, re, math, hashlib
 from dotenv import load_dotenv
 
 from langchain_upstage import (
@@ -27,8 +29,94 @@ load_dotenv()
 UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
 assert UPSTAGE_API_KEY, ".env 파일에 UPSTAGE_API_KEY가 없습니다."
 
+# reduce 단계 한 번에 넣을 부분 요약 토큰 예산 (토큰≈문자길이/2 기준 추정)
+REDUCE_TOKEN_BUDGET = 3000
+CHECKPOINT_DIR      = "./new_pdfs/.checkpoints"
+
+def estimate_tokens(text: str) -> int:
+    """한국어/영어 혼합 텍스트의 대략적인 토큰 수"""
+    return math.ceil(len(text) / 2)
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
 # ──────────────────────────────────────────────────────────────
-# 2) LLMService (PDF 1개 → JSON dict)
+# 2) 체크포인트 (PDF 해시별 텍스트 파일 + JSONL 로그)
+# ──────────────────────────────────────────────────────────────
+class Checkpoint:
+    """
+    PDF 1개에 대한 중간 결과 저장소.
+    • <hash>.txt   : 파싱 결과 (OCR 재호출 방지) – 한 번만 원자적으로(tmp → rename) 기록
+    • <hash>.jsonl : {"section", "key", "value"} 한 줄씩 추가
+        partial : 청크 해시 → 부분 요약 (map)
+        reduce  : 입력 해시 → 병합 요약 (tree-reduce 중간 노드)
+        final   : 최종 JSON dict
+    부분 요약마다 한 줄만 덧붙이므로 큰 PDF에서도 기록 비용이 요약 길이에 비례한다.
+    중간에 죽어 마지막 줄이 잘려도 그 줄만 버리고 이어서 처리된다.
+    """
+
+    def __init__(self, pdf_path: str, directory: str = CHECKPOINT_DIR):
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, sha256_file(pdf_path))
+        self.text_path = base + ".txt"
+        self.log_path  = base + ".jsonl"
+        self.data = {"partial": {}, "reduce": {}, "final": {}}
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "rb") as f:
+                raw = f.read()
+            complete = raw[:raw.rfind(b"\n") + 1]
+            if len(complete) < len(raw):
+                # 기록 도중 끊긴 마지막 줄은 잘라 내야 다음 줄이 이어 붙지 않음
+                print(f" 체크포인트 마지막 줄 손상, 잘라 냄: {self.log_path}")
+                with open(self.log_path, "r+b") as f:
+                    f.truncate(len(complete))
+            for line in complete.decode("utf-8").splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f" 체크포인트 손상된 줄 무시: {self.log_path}")
+                    continue
+                self.data[entry["section"]][entry["key"]] = entry["value"]
+
+    @property
+    def text(self):
+        if not os.path.exists(self.text_path):
+            return None
+        with open(self.text_path, encoding="utf-8") as f:
+            return f.read()
+
+    def set_text(self, text: str):
+        tmp = self.text_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, self.text_path)
+
+    @property
+    def final(self):
+        return self.data["final"].get("result")
+
+    def set_final(self, info: dict):
+        self.put("final", "result", info)
+
+    def get(self, section: str, key: str):
+        return self.data[section].get(key)
+
+    def put(self, section: str, key: str, value):
+        self.data[section][key] = value
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"section": section, "key": key, "value": value}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+# ──────────────────────────────────────────────────────────────
+# 3) LLMService (PDF 1개 → JSON dict)
 # ──────────────────────────────────────────────────────────────
 class LLMService:
     """큰 PDF도 처리 가능한 map-reduce 요약 서비스"""
@@ -67,7 +155,16 @@ class LLMService:
             input_variables=["chunk"],
         )
 
-        # ⑥ 최종 JSON 프롬프트 (reduce 단계)
+        # ⑥ 중간 병합 프롬프트 (tree-reduce 단계)
+        self.merge_prompt = PromptTemplate(
+            template=(
+                "다음은 논문의 부분 요약 리스트입니다. 핵심 발견, 방법, 결과, 한계를 "
+                "빠뜨리지 말고 한국어 4~6문장으로 통합 요약하세요:\n\n{context}"
+            ),
+            input_variables=["context"],
+        )
+
+        # ⑦ 최종 JSON 프롬프트 (reduce 단계)
         self.final_prompt = PromptTemplate(
             template="""
 다음은 논문의 부분 요약 리스트입니다. 이를 바탕으로
@@ -85,13 +182,19 @@ JSON 객체 하나만 출력하세요. summary는 한국어로 출력하고 이
             input_variables=["context"],
         )
 
-        # ⑦ 체인 구성
+        # ⑧ 체인 구성
         self.chunk_chain = (
             {"chunk": lambda x: x}
             | self.chunk_prompt
             | self.llm
             | StrOutputParser()
         )
+        self.merge_chain = (
+            {"context": lambda x: x}
+            | self.merge_prompt
+            | self.llm
+            | StrOutputParser()
+        )
         self.final_chain = (
             {"context": lambda x: x}
             | self.final_prompt
@@ -100,92 +203,146 @@ JSON 객체 하나만 출력하세요. summary는 한국어로 출력하고 이
         )
 
     # ────── 공개 메서드 ───────────────────────────────────────
-    def summarize(self) -> dict:
-        """PDF를 읽어 JSON dict 반환 (실패 시 빈 dict)"""
+    def summarize(self, pages: list = None) -> dict:
+        """
+        PDF를 읽어 JSON dict 반환 (실패 시 빈 dict)
+        pages: 이미 파싱된 Document 목록이 있으면 재사용 (파이프라인에서 OCR 중복 방지)
+        """
+        ckpt = Checkpoint(self.pdf_path)
+        if ckpt.final:
+            print("  • 체크포인트의 최종 요약 사용")
+            return ckpt.final
+
         # 1) 전체 텍스트 → 청크 배열
-        text = "\n\n".join(p.page_content for p in self.loader.load())
+        text = ckpt.text
+        if text is None:
+            text = "\n\n".join(p.page_content for p in (pages or self.loader.load()))
+            ckpt.set_text(text)
         chunks = self.splitter.split_text(text)
 
-        # 2) 각 청크 2~3문장 요약 (map)
+        # 2) 각 청크 2~3문장 요약 (map) – 청크 해시로 체크포인트
         partial_summaries = []
         for idx, ch in enumerate(chunks, 1):
-            print(f"  • 부분 요약 {idx}/{len(chunks)}")
-            summary = self.chunk_chain.invoke(ch).strip()
+            key = sha256_text(ch)
+            summary = ckpt.get("partial", key)
+            if summary is None:
+                print(f"  • 부분 요약 {idx}/{len(chunks)}")
+                summary = self.chunk_chain.invoke(ch).strip()
+                ckpt.put("partial", key, summary)
             partial_summaries.append(summary)
 
-        # 3) 부분 요약 합쳐 최종 JSON 생성 (reduce)
-        raw = self.final_chain.invoke("\n\n".join(partial_summaries)).strip()
+        # 3) 토큰 예산 안에 들어올 때까지 tree-reduce
+        context = self._tree_reduce(partial_summaries, ckpt)
+
+        # 4) 최종 JSON 생성 (reduce)
+        raw = self.final_chain.invoke(context).strip()
         raw = re.sub(r"```(?:json)?|```", "", raw).strip()
         try:
-            return json.loads(raw)
+            info = json.loads(raw)
         except json.JSONDecodeError as e:
             print(" JSON 파싱 실패:", e, "\n원문 일부:", raw[:200], "...")
             return {}
+        ckpt.set_final(info)
+        return info
+
+    # ────── 내부 메서드 ───────────────────────────────────────
+    def _tree_reduce(self, summaries: list, ckpt: Checkpoint) -> str:
+        """
+        부분 요약들을 토큰 예산(REDUCE_TOKEN_BUDGET) 단위 그룹으로 묶어 병합하고,
+        결과가 예산 안에 들어올 때까지 반복. 최종 프롬프트용 context 반환.
+        """
+        level = 1
+        while True:
+            context = "\n\n".join(summaries)
+            if len(summaries) <= 1 or estimate_tokens(context) <= REDUCE_TOKEN_BUDGET:
+                return context
+
+            groups = self._group_by_budget(summaries)
+            if len(groups) == len(summaries):
+                # 요약 하나하나가 예산을 넘는 경우: 두 개씩 묶어 반드시 줄어들게 함
+                groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+
+            merged = []
+            for idx, group in enumerate(groups, 1):
+                joined = "\n\n".join(group)
+                key = sha256_text(joined)
+                summary = ckpt.get("reduce", key)
+                if summary is None:
+                    print(f"  • 병합 요약 L{level} {idx}/{len(groups)}")
+                    summary = self.merge_chain.invoke(joined).strip()
+                    ckpt.put("reduce", key, summary)
+                merged.append(summary)
+            summaries = merged
+            level += 1
+
+    @staticmethod
+    def _group_by_budget(summaries: list) -> list:
+        """순서를 유지하며 토큰 예산을 넘지 않도록 인접 요약을 묶음"""
+        groups, current, used = [], [], 0
+        for s in summaries:
+            cost = estimate_tokens(s)
+            if current and used + cost > REDUCE_TOKEN_BUDGET:
+                groups.append(current)
+                current, used = [], 0
+            current.append(s)
+            used += cost
+        if current:
+            groups.append(current)
+        return groups
 
 # ──────────────────────────────────────────────────────────────
-# 3) 배치 처리
+# 4) 배치 처리 – 요약이 나오는 즉시 JSONL 스풀에 기록
+#    (uploader.py 가 스풀을 tail 하며 업로드)
 # ──────────────────────────────────────────────────────────────
-PDF_DIR   = "./new_pdfs"
-URLS_FILE = os.path.join(PDF_DIR, "urls.txt")
-assert os.path.exists(URLS_FILE), "urls.txt가 없습니다."
-
-with open(URLS_FILE, encoding="utf-8") as f:
-    urls = [u.strip() for u in f if u.strip()]
+PDF_DIR    = "./new_pdfs"
+URLS_FILE  = os.path.join(PDF_DIR, "urls.txt")
+SPOOL_FILE = os.path.join(PDF_DIR, "summaries.jsonl")
 
 def safe_name(url: str) -> str:
     n = (url.replace("://", "_").replace("/", "_")
              .replace("?", "_").replace("=", "_"))
     return n if n.lower().endswith(".pdf") else n + ".pdf"
 
-print("=== Chunked PDF Summarizer 시작 ===")
-results = []
+def append_spool(record: dict, spool_path: str = SPOOL_FILE):
+    """레코드 1건을 한 줄로 기록 (업로더가 읽는 단위)"""
+    with open(spool_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
 
-for url in urls:
-    pdf_path = os.path.join(PDF_DIR, safe_name(url))
-    if not os.path.exists(pdf_path):
-        print(f" PDF 파일 없음: {pdf_path}"); continue
+def main(upload: bool = True, bulk: bool = False):
+    assert os.path.exists(URLS_FILE), "urls.txt가 없습니다."
+    with open(URLS_FILE, encoding="utf-8") as f:
+        urls = [u.strip() for u in f if u.strip()]
 
-    print(f"▶ {os.path.basename(pdf_path)} 요약 중 ...")
-    info = LLMService(pdf_path).summarize()
-    if info:
-        record = {"url": url, **info}
-        print(json.dumps(record, ensure_ascii=False, indent=2))
-        print("-" * 60)
-        results.append(record)
+    stop_upload = None
+    if upload:
+        from uploader import start_background_upload
+        stop_upload = start_background_upload(SPOOL_FILE, bulk=bulk)
 
-print(f" 완료! 총 {len(results)}건 처리")
-# 필요 시 results를 파일로 저장
+    print("=== Chunked PDF Summarizer 시작 ===")
+    count = 0
+    for url in urls:
+        pdf_path = os.path.join(PDF_DIR, safe_name(url))
+        if not os.path.exists(pdf_path):
+            print(f" PDF 파일 없음: {pdf_path}"); continue
 
-"""
-llm으로 부터 받은 응답을 api를 통해 Mysql DB에 저장.
-"""
-import os
-import requests
-from dotenv import load_dotenv
+        print(f"▶ {os.path.basename(pdf_path)} 요약 중 ...")
+        info = LLMService(pdf_path).summarize()
+        if info:
+            record = {"url": url, **info}
+            print(json.dumps(record, ensure_ascii=False, indent=2))
+            print("-" * 60)
+            append_spool(record)
+            count += 1
 
-load_dotenv()
-BASE_URL   = os.getenv("BASE_URL")
-ACCESS_KEY = os.getenv("ACCESS_KEY")
-assert BASE_URL and ACCESS_KEY, "BASE_URL과 ACCESS_KEY를 .env에 설정하세요."
-
-headers = {
-    "Content-Type": "application/json",
-    "accesskey": ACCESS_KEY,           # Postman spec에 맞춰서
-}
-
-# ─── 2) results 리스트를 순회하며 저장 ────────────────────
-# 아래 'results' 는 chunk_pdf_summarizer.py 에서 모은 JSON dict 리스트입니다.
-for rec in results:
-    # API 스펙에 따르면 body는 { "json": {...} } 형태로 래핑
-    body = {"json": rec}
-    resp = requests.post(
-        f"{BASE_URL}/medical-info",
-        headers=headers,
-        json=body,
-        timeout=10,
-    )
-    try:
-        resp.raise_for_status()
-        print(f" 저장 성공: {rec['title']}")
-    except Exception as e:
-        print(f" 저장 실패 ({rec.get('title','unknown')}): {e}, 응답: {resp.text}")
+    print(f" 완료! 총 {count}건 처리")
+    if stop_upload:
+        print(" 업로드 통계:", json.dumps(stop_upload(), ensure_ascii=False))
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="PDF map-reduce 요약 + 업로드")
+    parser.add_argument("--no-upload", action="store_true", help="스풀에만 기록")
+    parser.add_argument("--bulk", action="store_true", help="/medical-info/bulk 로 업로드")
+    args = parser.parse_args()
+    main(upload=not args.no_upload, bulk=args.bulk)
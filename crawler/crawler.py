@@ -1,9 +1,10 @@
 import os
-import time
+import asyncio
 import requests
-from urllib.parse import urlparse, unquote
 from bs4 import BeautifulSoup
-from tqdm import tqdm
+
+from downloader import download_pdfs_async
+from frontier import Frontier, TokenBucket, FRONTIER_DB
 
 
 # ─── 설정 ────────────────────────────────────────────────
@@ -20,17 +21,14 @@ HEADERS = {
 국경없는 의사회의 2023년 공식 활동 보고서에서 가장 많이 파견한 상위 10개국의 나라에서 
 많이 발생하는 질병들의 리스트 = 검색할 질병들
 """
-KEYWORDS = ["Measles", "Cholera", "Hepatitis A", "Malaria",   
-    "Acute Watery Diarrhoea", "Diphtheria"
+KEYWORDS = ["Measles", "Cholera", "Hepatitis A", "Malaria",
+    "Acute Watery Diarrhoea", "Diphtheria",
     "Respiratory Infections", "Diarrheal Diseases",
-    "Trauma Care", "Burn Treatment"
-
-    """
-    홍역, 콜레라, A형 간염, 말라리아,
-    급성 수인성 설사, 디프테리아,
-    호흡기 감염, 설사 질환,
-    외상 치료, 화상 치료료
-    """
+    "Trauma Care", "Burn Treatment",
+    # 홍역, 콜레라, A형 간염, 말라리아,
+    # 급성 수인성 설사, 디프테리아,
+    # 호흡기 감염, 설사 질환,
+    # 외상 치료, 화상 치료
 ]
 
 OUTPUT_DIR = "downloaded_pdfs"
@@ -42,7 +40,7 @@ MAX_DOWNLOADS = 50
 MAX_PER_KEYWORD = 15     
 
 MAX_PAGES_PER_KEYWORD = 20
-DELAY_BETWEEN_PAGES = 10
+DELAY_BETWEEN_PAGES = 10   # 검색 요청 간 최소 간격(초) – 키워드와 무관하게 공유
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB 넘어가면 스킵(너무 느려짐)
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -65,100 +63,72 @@ def fetch_pdf_links_one_page(query: str, page: int):
             urls.append(a["href"])
     return urls
 
-def collect_pdf_links(keywords):
+def iter_pdf_links(keywords, frontier_path=FRONTIER_DB):
     """
-    키워드별로 MAX_PER_KEYWORD 링크를 모아서
-    총 최대 len(keywords) * MAX_PER_KEYWORD개 링크 반환
+    키워드를 라운드로빈으로 번갈아 요청하며 새로 발견한 URL을 페이지 단위로 yield.
+    요청 간격은 공유 토큰 버킷으로 DELAY_BETWEEN_PAGES초를 유지하고, 페이지 커서와
+    발견한 URL은 SQLite 프런티어에 페이지마다 기록되므로 중간에 죽어도 이어서 수집한다.
     """
-    collected = []
-    seen = set()
-
-    for kw in keywords:
-        print(f"\n '{kw}' 검색 시작 (최대 {MAX_PER_KEYWORD}개)")
-        per_count = 0
-
-        for page in range(MAX_PAGES_PER_KEYWORD):
-            if per_count >= MAX_PER_KEYWORD:
+    frontier = Frontier(frontier_path)
+    frontier.add_keywords(keywords)
+    bucket = TokenBucket(rate=1 / DELAY_BETWEEN_PAGES, capacity=1)
+
+    try:
+        while True:
+            pending = frontier.pending(keywords, MAX_PER_KEYWORD, MAX_PAGES_PER_KEYWORD)
+            if not pending:
                 break
 
-            print(f"  • 페이지 {page+1}", end="… ")
-            try:
-                urls = fetch_pdf_links_one_page(kw, page)
-            except Exception as e:
-                print(f"실패({e})")
-                break
-
-            added = 0
-            for url in urls:
+            for kw, page in pending:
+                bucket.acquire()
+                print(f"  • '{kw}' 페이지 {page+1}", end="… ")
+                try:
+                    urls = fetch_pdf_links_one_page(kw, page)
+                except Exception as e:
+                    print(f"실패({e})")
+                    frontier.record_failure(kw)
+                    continue
+
+                new_urls = frontier.record_page(kw, page, urls, MAX_PER_KEYWORD)
+                per_count = frontier.collected(kw)
+                print(f"키워드 '{kw}' 수집 {per_count}개 (이번 페이지 +{len(new_urls)})")
                 if per_count >= MAX_PER_KEYWORD:
-                    break
-                if url not in seen:
-                    seen.add(url)
-                    collected.append(url)
-                    per_count += 1
-                    added += 1
-
-            print(f"키워드 '{kw}' 수집 {per_count}개 (이번 페이지 +{added})")
-            if per_count >= MAX_PER_KEYWORD:
-                print(f"  • '{kw}' 키워드 수집 완료\n")
-                break
-
-            time.sleep(DELAY_BETWEEN_PAGES)
+                    print(f"  • '{kw}' 키워드 수집 완료\n")
+                if new_urls:
+                    yield kw, new_urls
+    finally:
+        frontier.close()
 
+def collect_pdf_links(keywords, frontier_path=FRONTIER_DB):
+    """
+    키워드별로 MAX_PER_KEYWORD 링크를 모아서
+    총 최대 len(keywords) * MAX_PER_KEYWORD개 링크 반환 (이전 실행에서 찾은 링크 포함)
+    """
+    for _ in iter_pdf_links(keywords, frontier_path):
+        pass
+    frontier = Frontier(frontier_path)
+    collected = frontier.links(keywords)
+    frontier.close()
     print(f"\n▶ 총 {len(collected)}개 링크 수집 완료 (링크 풀링 완료)")
     return collected
 
 def download_pdfs(urls, output_dir):
     """
-    링크 풀에서 성공적으로 100개 다운로드될 때까지 시도
-    skip 403, 대용량 파일, 실패 등은 건너뜀
+    링크 풀에서 MAX_DOWNLOADS개가 성공할 때까지 동시에 다운로드 (downloader.py)
+    403, PDF가 아닌 응답, 대용량 파일 등은 건너뜀
     """
-    session = requests.Session()
-    success_count = 0
-
-    for idx, url in enumerate(tqdm(urls, desc="다운로드 진행"), start=1):
-        if success_count >= MAX_DOWNLOADS:
-            break
-
-        # 1) HEAD 체크
-        try:
-            head = session.head(url, headers=HEADERS, timeout=5)
-            if head.status_code == 403 or head.status_code != 200:
-                continue
-            size = int(head.headers.get("Content-Length", 0) or 0)
-            if size > MAX_FILE_SIZE:
-                continue
-        except:
-            continue
-
-        # 2) 파일명 결정
-        path = urlparse(url).path
-        fname = unquote(os.path.basename(path).split("?")[0])
-        if not fname.lower().endswith(".pdf"):
-            fname = f"{idx}_0526_2.pdf"
-        dest = os.path.join(output_dir, fname)
-        if os.path.exists(dest):
-            continue  # 이미 있으면 skip
-
-        # 3) 스트리밍 다운로드
-        try:
-            with session.get(url, headers=HEADERS, stream=True, timeout=(5,10)) as r:
-                r.raise_for_status()
-                with open(dest, "wb") as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-            success_count += 1
-        except Exception:
-            continue
-
-    print(f"\n 총 {success_count}개 파일 다운로드 성공")
+    return asyncio.run(download_pdfs_async(
+        urls, output_dir,
+        headers=HEADERS,
+        max_file_size=MAX_FILE_SIZE,
+        max_downloads=MAX_DOWNLOADS,
+    ))
 
 if __name__ == "__main__":
     # 1) 링크 수집
     all_links = collect_pdf_links(KEYWORDS)
 
-    # 2) 다운로드 (100개 채울 때까지)
+    # 2) 다운로드 (MAX_DOWNLOADS개 채울 때까지)
     download_pdfs(all_links, OUTPUT_DIR)
 
     print("\n 모든 작업 완료")
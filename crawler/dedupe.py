@@ -0,0 +1,276 @@
+"""
+dedupe.py
+────────────────────────────────────────────────────────────────
+파싱/임베딩 전에 중복 문서를 걸러내는 단계 (indexer.py 에서 사용).
+• 문서 단위 : 파일 SHA-256 (완전 중복) → pypdf 텍스트 MinHash/LSH (미러·재배포본)
+• 청크 단위 : 정규화 텍스트 해시 + MinHash/LSH 로 거의 같은 청크는 업서트 생략
+• 절약량   : 건너뛴 바이트 / OCR 페이지 / 임베딩 입력 수 집계
+• 처리 중 예약 : 검증을 통과한 문서/청크는 인덱싱이 끝나기 전에도 비교 대상에 넣어
+                 동시에 들어온 미러 사본이 같이 통과하지 않게 함 (실패 시 release_document)
+상태는 dedupe.db (SQLite)에 저장되어 실행 간에 유지된다.
+────────────────────────────────────────────────────────────────
+"""
+import re
+import hashlib
+import functools
+import sqlite3
+import threading
+
+import numpy as np
+
+DEDUPE_DB        = "dedupe.db"
+NUM_PERM         = 128
+LSH_BANDS        = 16            # 16 x 8 → 유사도 ≈0.7 부근부터 후보로 잡힘
+LSH_ROWS         = NUM_PERM // LSH_BANDS
+DOC_THRESHOLD    = 0.85          # 문서 near-duplicate 판정 Jaccard
+CHUNK_THRESHOLD  = 0.9           # 청크 near-duplicate 판정 Jaccard
+DOC_SHINGLE      = 5             # 단어 5-gram
+CHUNK_SHINGLE    = 3             # 청크는 짧으므로 3-gram
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id    TEXT PRIMARY KEY,
+    sha256    TEXT,
+    signature BLOB,
+    pages     INTEGER,
+    bytes     INTEGER
+);
+CREATE INDEX IF NOT EXISTS docs_sha256 ON docs (sha256);
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_hash TEXT PRIMARY KEY,
+    doc_id     TEXT,
+    signature  BLOB
+);
+CREATE TABLE IF NOT EXISTS lsh (
+    kind   TEXT,
+    band   INTEGER,
+    bucket TEXT,
+    key    TEXT
+);
+CREATE INDEX IF NOT EXISTS lsh_lookup ON lsh (kind, band, bucket);
+"""
+
+
+def normalize(text: str) -> str:
+    """대소문자/공백/구두점 차이를 무시한 비교용 텍스트"""
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize(text).encode("utf-8")).hexdigest()
+
+
+class MinHasher:
+    """단어 k-gram 집합의 MinHash 서명 (32bit 해시 + 2^61-1 모듈러 순열)"""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, text: str, k: int):
+        words = normalize(text).split()
+        if len(words) < k:
+            return None
+        grams = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little")
+             for g in grams),
+            dtype=np.uint64, count=len(grams),
+        )
+        # (a*h + b) mod p 의 최소값 – 32bit 값끼리의 곱이라 uint64에서 넘치지 않음
+        perms = (np.outer(hashes, self.a) + self.b) % _MERSENNE & _MAX_HASH
+        return perms.min(axis=0)
+
+    @staticmethod
+    def jaccard(sig1, sig2) -> float:
+        return float(np.mean(sig1 == sig2))
+
+
+def _locked(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class DedupeStore:
+    def __init__(self, path: str = DEDUPE_DB):
+        # 파이프라인에서는 여러 스레드가 같은 저장소를 쓰므로 잠금으로 직렬화
+        self.conn   = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.lock   = threading.RLock()
+        self.hasher = MinHasher()
+        # 인덱싱 중(아직 add_document 전)인 예약 – 메모리에만 유지
+        self.pending_docs   = {}        # doc_id → (sha256, signature)
+        self.pending_chunks = {}        # chunk_hash → (doc_id, signature)
+        self.stats  = {"duplicate_docs": 0, "near_duplicate_docs": 0, "duplicate_chunks": 0,
+                       "bytes_saved": 0, "pages_saved": 0, "embedding_calls_saved": 0}
+
+    # ────── 문서 단위 ─────────────────────────────────────────
+    @_locked
+    def find_exact(self, sha256: str, exclude: str = None):
+        """같은 파일 해시로 이미 인덱싱된(또는 인덱싱 중인) 문서의 doc_id (없으면 None)"""
+        for doc_id, (pending_sha, _) in self.pending_docs.items():
+            if doc_id != exclude and pending_sha == sha256:
+                return doc_id
+        row = self.conn.execute("SELECT doc_id FROM docs WHERE sha256 = ?", (sha256,)).fetchone()
+        return row[0] if row else None
+
+    @_locked
+    def find_near(self, text: str, exclude: str = None):
+        """
+        이미 인덱싱된(또는 인덱싱 중인) 문서 중 거의 같은 문서 → (doc_id, 유사도).
+        없으면 (None, 최고 유사도).
+        text는 pypdf로 뽑은 저렴한 텍스트면 충분하다 (OCR 전 단계에서 호출).
+        """
+        sig = self.hasher.signature(text, DOC_SHINGLE) if text else None
+        return self._near_doc(sig, exclude)
+
+    @_locked
+    def reserve_document(self, doc_id: str, sha256: str, text: str):
+        """
+        중복 확인과 예약을 한 번에 → (원본 doc_id, 유사도, 완전 중복 여부).
+        중복이 아니면 doc_id를 인덱싱 중으로 예약하고 (None, 최고 유사도, False).
+        같은 doc_id로 다시 부르면 예약을 갱신한다 (스캔본의 OCR 후 재확인).
+        예약은 add_document()로 확정하거나 release_document()로 풀어야 한다.
+        """
+        dup_of = self.find_exact(sha256, exclude=doc_id)
+        if dup_of:
+            return dup_of, 1.0, True
+        sig = self.hasher.signature(text, DOC_SHINGLE) if text else None
+        dup_of, similarity = self._near_doc(sig, exclude=doc_id)
+        if dup_of:
+            return dup_of, similarity, False
+        self.pending_docs[doc_id] = (sha256, sig)
+        return None, similarity, False
+
+    @_locked
+    def release_document(self, doc_id: str):
+        """인덱싱 실패/중단 시 문서와 그 청크 예약 해제 (다음 실행이나 다른 사본이 처리할 수 있게)"""
+        self.pending_docs.pop(doc_id, None)
+        self.pending_chunks = {h: v for h, v in self.pending_chunks.items() if v[0] != doc_id}
+
+    @_locked
+    def record_skip(self, exact: bool, size: int, pages: int, est_chunks: int):
+        self.stats["duplicate_docs" if exact else "near_duplicate_docs"] += 1
+        self.stats["bytes_saved"] += size
+        self.stats["pages_saved"] += pages
+        self.stats["embedding_calls_saved"] += est_chunks
+
+    @_locked
+    def add_document(self, doc_id: str, sha256: str, text: str, pages: int, size: int):
+        sig = self.hasher.signature(text, DOC_SHINGLE) if text else None
+        self.pending_docs.pop(doc_id, None)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?, ?)",
+                (doc_id, sha256, sig.tobytes() if sig is not None else None, pages, size),
+            )
+            if sig is not None:
+                self._index("doc", sig, doc_id)
+
+    # ────── 청크 단위 ─────────────────────────────────────────
+    @_locked
+    def filter_chunks(self, doc_id: str, docs: list) -> list:
+        """
+        이미 업서트된 청크, 다른 문서가 업서트 중인 청크, 이번 배치 안의 앞선 청크와
+        같거나 거의 같은 청크 제거. 남은 청크는 doc_id 소유로 예약되며
+        add_chunks()로 확정하거나 release_document()로 풀어야 한다.
+        """
+        kept = []
+        for doc in docs:
+            h = text_hash(doc.page_content)
+            if h in self.pending_chunks or self.conn.execute(
+                "SELECT 1 FROM chunks WHERE chunk_hash = ?", (h,)
+            ).fetchone():
+                self.stats["duplicate_chunks"] += 1
+                continue
+            sig = self.hasher.signature(doc.page_content, CHUNK_SHINGLE)
+            if sig is not None and (
+                any(s is not None and MinHasher.jaccard(sig, s) >= CHUNK_THRESHOLD
+                    for _, s in self.pending_chunks.values())
+                or self._near_chunk(sig)
+            ):
+                self.stats["duplicate_chunks"] += 1
+                continue
+            self.pending_chunks[h] = (doc_id, sig)
+            kept.append(doc)
+        self.stats["embedding_calls_saved"] += len(docs) - len(kept)
+        return kept
+
+    @_locked
+    def add_chunks(self, doc_id: str, docs: list):
+        with self.conn:
+            for doc in docs:
+                h = text_hash(doc.page_content)
+                self.pending_chunks.pop(h, None)
+                sig = self.hasher.signature(doc.page_content, CHUNK_SHINGLE)
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO chunks VALUES (?, ?, ?)",
+                    (h, doc_id, sig.tobytes() if sig is not None else None),
+                )
+                if sig is not None:
+                    self._index("chunk", sig, h)
+
+    def report(self) -> str:
+        s = self.stats
+        return (f"중복 문서 {s['duplicate_docs']}건 + 유사 문서 {s['near_duplicate_docs']}건 스킵, "
+                f"중복 청크 {s['duplicate_chunks']}개 제거 → "
+                f"{s['bytes_saved'] / 1024 / 1024:.1f}MB, OCR {s['pages_saved']}페이지, "
+                f"임베딩 {s['embedding_calls_saved']}건 절약")
+
+    def close(self):
+        self.conn.close()
+
+    # ────── LSH ──────────────────────────────────────────────
+    @staticmethod
+    def _bands(sig):
+        for band in range(LSH_BANDS):
+            rows = sig[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+            yield band, hashlib.md5(rows.tobytes()).hexdigest()
+
+    def _index(self, kind: str, sig, key: str):
+        self.conn.executemany(
+            "INSERT INTO lsh VALUES (?, ?, ?, ?)",
+            [(kind, band, bucket, key) for band, bucket in self._bands(sig)],
+        )
+
+    def _candidates(self, kind: str, sig) -> set:
+        found = set()
+        for band, bucket in self._bands(sig):
+            rows = self.conn.execute(
+                "SELECT key FROM lsh WHERE kind = ? AND band = ? AND bucket = ?", (kind, band, bucket)
+            ).fetchall()
+            found.update(r[0] for r in rows)
+        return found
+
+    def _near_doc(self, sig, exclude: str = None):
+        if sig is None:
+            return None, 0.0
+        others = [(doc_id, s) for doc_id, (_, s) in self.pending_docs.items()
+                  if doc_id != exclude and s is not None]
+        for doc_id in self._candidates("doc", sig):
+            row = self.conn.execute("SELECT signature FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+            if row and row[0]:
+                others.append((doc_id, np.frombuffer(row[0], dtype=np.uint64)))
+        best, best_sim = None, 0.0
+        for doc_id, other in others:
+            sim = MinHasher.jaccard(sig, other)
+            if sim > best_sim:
+                best, best_sim = doc_id, sim
+        if best_sim >= DOC_THRESHOLD:
+            return best, best_sim
+        return None, best_sim
+
+    def _near_chunk(self, sig) -> bool:
+        for key in self._candidates("chunk", sig):
+            row = self.conn.execute("SELECT signature FROM chunks WHERE chunk_hash = ?", (key,)).fetchone()
+            if row and row[0] and MinHasher.jaccard(sig, np.frombuffer(row[0], dtype=np.uint64)) >= CHUNK_THRESHOLD:
+                return True
+        return False
@@ -0,0 +1,240 @@
+"""
+downloader.py
+────────────────────────────────────────────────────────────────
+asyncio 기반 PDF 동시 다운로더.
+• 전체 동시 다운로드 수 + 호스트별 동시 다운로드 수 제한
+• 1MB 버퍼로 임시 파일(.partial/)에 스트리밍, 끊기면 HTTP Range로 이어받기
+• Content-Type / PDF 시그니처(%PDF-) 검증, 받는 동안 SHA-256 계산
+• 최종 파일명은 내용 해시 기반 → 미러가 달라도 같은 파일은 한 번만 저장
+• URL ↔ 파일 매핑은 output_dir/manifest.jsonl 에 기록 (재실행 시 스킵)
+
+테스트: python stub_server.py 실행 후
+        download_pdfs_async(["http://127.0.0.1:8765/pdfs/a.pdf"], "out")
+────────────────────────────────────────────────────────────────
+"""
+import os, json, time, asyncio, hashlib
+from urllib.parse import urlparse
+
+import aiohttp
+
+MANIFEST_NAME   = "manifest.jsonl"
+PARTIAL_DIR     = ".partial"
+DOWNLOAD_CHUNK  = 1024 * 1024          # 1MB 단위로 읽고 씀
+GLOBAL_LIMIT    = 8                    # 전체 동시 다운로드 수
+PER_HOST_LIMIT  = 2                    # 호스트별 동시 다운로드 수
+MAX_ATTEMPTS    = 3                    # 연결 끊김 시 이어받기 시도 횟수
+PDF_MAGIC       = b"%PDF-"
+ACCEPTED_TYPES  = {
+    "application/pdf", "application/x-pdf",
+    "application/octet-stream", "binary/octet-stream",
+}
+
+
+class SkipDownload(Exception):
+    """재시도해도 의미 없는 실패 (403, 잘못된 타입, 용량 초과 등)"""
+
+
+def load_manifest(output_dir: str) -> dict:
+    """manifest.jsonl → {url: entry}"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    entries = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    entries[entry["url"]] = entry
+    return entries
+
+
+class PdfDownloader:
+    def __init__(self, output_dir: str, headers: dict = None,
+                 global_limit: int = GLOBAL_LIMIT, per_host_limit: int = PER_HOST_LIMIT,
+                 max_file_size: int = 100 * 1024 * 1024, max_downloads: int = None,
+                 timeout: aiohttp.ClientTimeout = None):
+        self.output_dir     = output_dir
+        self.partial_dir    = os.path.join(output_dir, PARTIAL_DIR)
+        self.manifest_path  = os.path.join(output_dir, MANIFEST_NAME)
+        self.headers        = headers or {}
+        self.max_file_size  = max_file_size
+        self.max_downloads  = max_downloads
+        self.per_host_limit = per_host_limit
+        self.timeout        = timeout or aiohttp.ClientTimeout(total=None, sock_connect=5, sock_read=30)
+
+        self.global_sem = asyncio.Semaphore(global_limit)
+        self.host_sems  = {}
+        self.manifest   = load_manifest(output_dir)
+        self.stats      = {"downloaded": 0, "duplicates": 0, "resumed": 0,
+                           "skipped": 0, "failed": 0, "bytes": 0}
+        os.makedirs(self.partial_dir, exist_ok=True)
+
+    # ────── 공개 메서드 ───────────────────────────────────────
+    async def download_all(self, urls, on_file=None) -> list:
+        """
+        URL 목록을 동시에 다운로드. 새로 받은 파일의 manifest entry 목록 반환.
+        on_file(entry) 콜백은 파일이 준비되는 즉시 호출된다 (파이프라인 연결용).
+        """
+        connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.per_host_limit)
+        async with aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                         timeout=self.timeout) as session:
+            tasks = [asyncio.create_task(self.download(session, url, on_file))
+                     for url in dict.fromkeys(urls) if url not in self.manifest]
+            results = []
+            for fut in asyncio.as_completed(tasks):
+                entry = await fut
+                if entry and not entry.get("duplicate"):
+                    results.append(entry)
+                if self._enough():
+                    for t in tasks:
+                        t.cancel()
+                    break
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return results
+
+    async def download(self, session: aiohttp.ClientSession, url: str, on_file=None):
+        """URL 1개 다운로드 → manifest entry (실패 시 None)"""
+        host = urlparse(url).netloc
+        host_sem = self.host_sems.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        async with host_sem, self.global_sem:
+            if self._enough():
+                return None
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                try:
+                    entry = await self._fetch(session, url)
+                    break
+                except SkipDownload as e:
+                    self.stats["skipped"] += 1
+                    print(f" 스킵: {url} ({e})")
+                    return None
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if attempt == MAX_ATTEMPTS:
+                        self.stats["failed"] += 1
+                        print(f" 실패: {url} ({e.__class__.__name__})")
+                        return None
+                    await asyncio.sleep(2 ** attempt)
+        self._record(entry)
+        if on_file and not entry.get("duplicate"):
+            result = on_file(entry)
+            if asyncio.iscoroutine(result):
+                await result
+        return entry
+
+    # ────── 내부 메서드 ───────────────────────────────────────
+    def _enough(self) -> bool:
+        return self.max_downloads is not None and self.stats["downloaded"] >= self.max_downloads
+
+    async def _fetch(self, session: aiohttp.ClientSession, url: str) -> dict:
+        part = os.path.join(self.partial_dir, hashlib.sha1(url.encode()).hexdigest() + ".part")
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        started = time.perf_counter()
+
+        async with session.get(url, headers=headers) as resp:
+            if resp.status == 416 and offset:
+                # 이전 실행에서 끝까지 받았지만 이름 변경 전에 멈춘 경우
+                digest, size, head = await asyncio.to_thread(self._hash_file, part)
+                return self._finalize(url, part, started, digest, size, head)
+            if resp.status not in (200, 206):
+                raise SkipDownload(f"HTTP {resp.status}")
+
+            ctype = resp.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if ctype and ctype not in ACCEPTED_TYPES:
+                raise SkipDownload(f"Content-Type {ctype}")
+
+            resumed = resp.status == 206
+            length = resp.content_length
+            if not resumed:
+                offset = 0                     # 서버가 Range 미지원 → 처음부터
+            if length is not None and offset + length > self.max_file_size:
+                raise SkipDownload(f"용량 초과 {offset + length} bytes")
+
+            # 받는 동안 해시 계산 – 이어받기면 기존 조각으로 해시 상태를 복원
+            if resumed:
+                self.stats["resumed"] += 1
+                hasher, head = await asyncio.to_thread(self._seed_hash, part, offset)
+            else:
+                hasher, head = hashlib.sha256(), b""
+
+            with open(part, "r+b" if resumed else "wb", buffering=DOWNLOAD_CHUNK) as f:
+                f.seek(offset)
+                f.truncate()
+                received = offset
+                async for chunk in resp.content.iter_chunked(DOWNLOAD_CHUNK):
+                    if len(head) < len(PDF_MAGIC):
+                        head += chunk[:len(PDF_MAGIC) - len(head)]
+                        if not PDF_MAGIC.startswith(head):
+                            f.close()
+                            os.remove(part)
+                            raise SkipDownload("PDF 시그니처 없음")
+                    received += len(chunk)
+                    if received > self.max_file_size:
+                        f.close()
+                        os.remove(part)
+                        raise SkipDownload(f"용량 초과 {received} bytes")
+                    hasher.update(chunk)
+                    f.write(chunk)
+                    self.stats["bytes"] += len(chunk)
+
+        return self._finalize(url, part, started, hasher.hexdigest(), received, head)
+
+    def _finalize(self, url: str, part: str, started: float,
+                  digest: str, size: int, head: bytes) -> dict:
+        """해시 기반 이름으로 이동 (같은 내용이 이미 있으면 중복 처리)"""
+        if not head.startswith(PDF_MAGIC):
+            os.remove(part)
+            raise SkipDownload("PDF 시그니처 없음")
+
+        fname = f"{digest[:16]}.pdf"
+        dest = os.path.join(self.output_dir, fname)
+        duplicate = os.path.exists(dest)
+        if duplicate:
+            os.remove(part)
+            self.stats["duplicates"] += 1
+        else:
+            os.replace(part, dest)
+            self.stats["downloaded"] += 1
+        return {"url": url, "file": fname, "sha256": digest, "bytes": size,
+                "seconds": round(time.perf_counter() - started, 3), "duplicate": duplicate}
+
+    @staticmethod
+    def _seed_hash(path: str, offset: int):
+        """이어받기 전 기존 조각(offset 바이트)으로 해시 상태 복원"""
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            head = f.read(len(PDF_MAGIC))
+            f.seek(0)
+            remaining = offset
+            while remaining:
+                block = f.read(min(DOWNLOAD_CHUNK, remaining))
+                if not block:
+                    break
+                h.update(block)
+                remaining -= len(block)
+        return h, head
+
+    @staticmethod
+    def _hash_file(path: str):
+        h = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as f:
+            head = f.read(len(PDF_MAGIC))
+            f.seek(0)
+            for block in iter(lambda: f.read(DOWNLOAD_CHUNK), b""):
+                h.update(block)
+                size += len(block)
+        return h.hexdigest(), size, head
+
+    def _record(self, entry: dict):
+        self.manifest[entry["url"]] = entry
+        with open(self.manifest_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+async def download_pdfs_async(urls, output_dir: str, **kwargs) -> list:
+    downloader = PdfDownloader(output_dir, **kwargs)
+    results = await downloader.download_all(urls)
+    print(f"\n 총 {downloader.stats['downloaded']}개 파일 다운로드 성공 "
+          f"(중복 {downloader.stats['duplicates']}, 이어받기 {downloader.stats['resumed']}, "
+          f"스킵 {downloader.stats['skipped']}, 실패 {downloader.stats['failed']})")
+    return results
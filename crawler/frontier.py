@@ -0,0 +1,154 @@
+"""
+frontier.py
+────────────────────────────────────────────────────────────────
+크롤러 링크 프런티어 (SQLite) + 토큰 버킷 요청 스케줄러.
+• keywords : 키워드별 다음 페이지 커서 / 수집 개수 / 완료 여부
+• links    : 발견한 PDF URL (어느 키워드, 몇 페이지에서 찾았는지)
+페이지 1개를 처리할 때마다 커밋하므로 프로세스가 죽어도
+다음 실행에서 정확히 멈춘 페이지부터 이어서 수집한다.
+────────────────────────────────────────────────────────────────
+"""
+import time
+import sqlite3
+import threading
+
+FRONTIER_DB  = "frontier.db"
+MAX_FAILURES = 2          # 연속 실패 시 해당 키워드 포기
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS keywords (
+    keyword    TEXT PRIMARY KEY,
+    position   INTEGER NOT NULL,
+    next_page  INTEGER NOT NULL DEFAULT 0,
+    collected  INTEGER NOT NULL DEFAULT 0,
+    failures   INTEGER NOT NULL DEFAULT 0,
+    done       INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS links (
+    url           TEXT PRIMARY KEY,
+    keyword       TEXT NOT NULL,
+    page          INTEGER NOT NULL,
+    discovered_at REAL NOT NULL
+);
+"""
+
+
+class TokenBucket:
+    """
+    rate 개/초로 토큰이 채워지는 버킷 (최대 capacity개).
+    capacity=1 이면 요청 간격이 최소 1/rate 초로 유지되고,
+    요청 처리에 걸린 시간만큼은 기다리지 않는다.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate     = rate
+        self.capacity = capacity
+        self.tokens   = capacity
+        self.updated  = time.monotonic()
+        self.lock     = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> float:
+        """토큰을 얻으면 0, 아니면 다음 토큰까지 남은 초"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return
+            time.sleep(wait)
+
+
+class Frontier:
+    def __init__(self, path: str = FRONTIER_DB):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def add_keywords(self, keywords):
+        with self.conn:
+            start = self.conn.execute("SELECT COUNT(*) FROM keywords").fetchone()[0]
+            for pos, kw in enumerate(keywords, start):
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO keywords (keyword, position) VALUES (?, ?)", (kw, pos)
+                )
+
+    def pending(self, keywords, max_per_keyword: int, max_pages: int) -> list:
+        """아직 수집할 페이지가 남은 (keyword, next_page) 목록 (키워드 등록 순)"""
+        marks = ",".join("?" * len(keywords))
+        return self.conn.execute(
+            f"""SELECT keyword, next_page FROM keywords
+                WHERE done = 0 AND collected < ? AND next_page < ? AND keyword IN ({marks})
+                ORDER BY position""",
+            (max_per_keyword, max_pages, *keywords),
+        ).fetchall()
+
+    def record_page(self, keyword: str, page: int, urls, max_per_keyword: int) -> list:
+        """한 페이지 결과 반영 (새 URL 추가 + 커서 전진). 새로 추가된 URL 목록 반환"""
+        with self.conn:
+            collected = self.conn.execute(
+                "SELECT collected FROM keywords WHERE keyword = ?", (keyword,)
+            ).fetchone()[0]
+            new_urls = []
+            for url in urls:
+                if collected + len(new_urls) >= max_per_keyword:
+                    break
+                cur = self.conn.execute(
+                    "INSERT OR IGNORE INTO links (url, keyword, page, discovered_at) VALUES (?, ?, ?, ?)",
+                    (url, keyword, page, time.time()),
+                )
+                if cur.rowcount:
+                    new_urls.append(url)
+            added = len(new_urls)
+            self.conn.execute(
+                """UPDATE keywords
+                   SET next_page = ?, collected = collected + ?, failures = 0,
+                       done = CASE WHEN collected + ? >= ? THEN 1 ELSE 0 END
+                   WHERE keyword = ?""",
+                (page + 1, added, added, max_per_keyword, keyword),
+            )
+        return new_urls
+
+    def record_failure(self, keyword: str):
+        """페이지 요청 실패 – MAX_FAILURES번 연속 실패하면 키워드 종료"""
+        with self.conn:
+            self.conn.execute(
+                """UPDATE keywords
+                   SET failures = failures + 1,
+                       done = CASE WHEN failures + 1 >= ? THEN 1 ELSE 0 END
+                   WHERE keyword = ?""",
+                (MAX_FAILURES, keyword),
+            )
+
+    def links(self, keywords=None) -> list:
+        """발견 순서대로 URL 목록"""
+        if keywords is None:
+            rows = self.conn.execute("SELECT url FROM links ORDER BY discovered_at").fetchall()
+        else:
+            marks = ",".join("?" * len(keywords))
+            rows = self.conn.execute(
+                f"SELECT url FROM links WHERE keyword IN ({marks}) ORDER BY discovered_at",
+                tuple(keywords),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def keyword_of(self, url: str):
+        row = self.conn.execute("SELECT keyword FROM links WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def collected(self, keyword: str) -> int:
+        row = self.conn.execute("SELECT collected FROM keywords WHERE keyword = ?", (keyword,)).fetchone()
+        return row[0] if row else 0
+
+    def close(self):
+        self.conn.close()
@@ -1,4 +1,5 @@
 import os
+import hashlib
 from dotenv import load_dotenv
 from pinecone import Pinecone
 from pypdf import PdfReader
@@ -7,6 +8,11 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_pinecone import PineconeVectorStore
 from langchain.schema import Document
 
+from dedupe import DedupeStore
+from downloader import load_manifest
+from frontier import Frontier, FRONTIER_DB
+from tags import infer_tags, chunk_tags
+
 # 0) .env 로드
 load_dotenv()
 
@@ -38,77 +44,211 @@ else:
 # ---------- 배치 크기 설정 ----------
 BATCH_SIZE = 100  # 업로드 배치당 최대 청크 수
 
-# 6) PDF 파싱 및 인덱싱
 PDF_DIR = "downloaded_pdfs"
-for root, _, files in os.walk(PDF_DIR):
-    for fname in files:
-        if not fname.lower().endswith(".pdf"):
-            continue
-        if fname in processed_files:
-            print(f" 이미 처리됨, 스킵: {fname}")
-            continue
-        pdf_path = os.path.join(root, fname)
-
-        # 6.1) 파일 크기 검증
-        if os.path.getsize(pdf_path) < 10 * 1024:
-            print(f" 너무 작은 파일, 스킵: {fname}")
-            continue
-
-        # 6.2) PDF 유효성 확인
-        try:
-            reader = PdfReader(pdf_path)
-            if len(reader.pages) == 0:
-                print(f" 페이지 없음, 스킵: {fname}")
-                continue
-        except Exception as e:
-            print(f" 유효하지 않은 PDF, 스킵: {fname} ({e})")
-            continue
 
-        # 6.3) Upstage 파싱
-        print(f" 파싱 중: {fname}")
-        loader = UpstageDocumentParseLoader(pdf_path, ocr="force")
+def mark_processed(fname: str):
+    processed_files.add(fname)
+    with open(PROCESSED_FILE, "a", encoding="utf-8") as f:
+        f.write(fname + "\n")
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def extract_text(reader: PdfReader) -> str:
+    """OCR 전 중복 판정용 저렴한 텍스트 (스캔본이면 빈 문자열)"""
+    texts = []
+    for page in reader.pages:
         try:
-            pages = loader.load()
-        except Exception as e:
-            print(f" 파싱 실패, 스킵: {fname} ({e})")
-            continue
-        
-
-        # 6.4) 텍스트 청크 생성
-        docs = []
-        for page_idx, page in enumerate(pages):
-            chunks = splitter.split_text(page.page_content)
-            for chunk_idx, text in enumerate(chunks):
-                docs.append(
-                    Document(
-                        page_content=text,
-                        metadata={
-                            "source_file": fname,
-                            "page": page_idx,
-                            "chunk": chunk_idx
-                        }
-                    )
+            texts.append(page.extract_text() or "")
+        except Exception:
+            texts.append("")
+    return "\n".join(texts).strip()
+
+def pdf_title(reader: PdfReader) -> str:
+    """PDF 문서 정보의 제목 (없거나 읽을 수 없으면 빈 문자열)"""
+    try:
+        title = reader.metadata.title if reader.metadata else None
+    except Exception:
+        return ""
+    return " ".join(str(title).split())[:300] if title else ""
+
+def estimate_chunks(text: str, pages: int) -> int:
+    """건너뛴 문서가 만들었을 청크(=임베딩 입력) 수 추정"""
+    if text:
+        return len(splitter.split_text(text))
+    return pages
+
+# 6) PDF 파싱 및 인덱싱 – 파이프라인(pipeline.py)에서 단계별로 호출할 수 있도록 분리
+def validate_pdf(pdf_path: str, dedupe: DedupeStore, keyword: str = None, url: str = None):
+    """
+    크기/유효성/중복 확인. 통과하면 다음 단계로 넘길 dict, 아니면 None
+    통과한 문서는 dedupe에 인덱싱 중으로 예약된다 (parse_pdf/index_pages 실패 시 해제)
+    keyword: 이 PDF를 찾은 검색 키워드 (질병 태그로 사용)
+    url: 원본 URL (파일 이름은 내용 해시라서 근거 문서 표시에는 URL/제목을 씀)
+    """
+    fname = os.path.basename(pdf_path)
+
+    # 6.1) 파일 크기 검증
+    size = os.path.getsize(pdf_path)
+    if size < 10 * 1024:
+        print(f" 너무 작은 파일, 스킵: {fname}")
+        return None
+
+    # 6.2) PDF 유효성 확인
+    try:
+        reader = PdfReader(pdf_path)
+        if len(reader.pages) == 0:
+            print(f" 페이지 없음, 스킵: {fname}")
+            return None
+    except Exception as e:
+        print(f" 유효하지 않은 PDF, 스킵: {fname} ({e})")
+        return None
+
+    # 6.3) 중복 확인 + 예약 (OCR/임베딩 전에 완전 중복 + 유사 문서 제거, 처리 중인 사본 포함)
+    digest = sha256_file(pdf_path)
+    cheap_text = extract_text(reader)
+    dup_of, similarity, exact = dedupe.reserve_document(fname, digest, cheap_text)
+    if dup_of:
+        reason = "동일 파일" if exact else f"유사도 {similarity:.2f}"
+        print(f" 중복 문서, 스킵: {fname} ≈ {dup_of} ({reason})")
+        dedupe.record_skip(exact, size, len(reader.pages),
+                           estimate_chunks(cheap_text, len(reader.pages)))
+        mark_processed(fname)
+        return None
+
+    return {"path": pdf_path, "fname": fname, "sha256": digest,
+            "cheap_text": cheap_text, "size": size, "keyword": keyword,
+            "url": url, "title": pdf_title(reader)}
+
+def parse_pdf(doc: dict, dedupe: DedupeStore):
+    """Upstage OCR 파싱. 페이지 목록 (실패/중복이면 None)"""
+    fname = doc["fname"]
+
+    # 6.4) Upstage 파싱
+    print(f" 파싱 중: {fname}")
+    loader = UpstageDocumentParseLoader(doc["path"], ocr="force")
+    try:
+        pages = loader.load()
+    except Exception as e:
+        print(f" 파싱 실패, 스킵: {fname} ({e})")
+        dedupe.release_document(fname)
+        return None
+
+    # 스캔본은 OCR 결과로 한 번 더 유사 문서 확인 (예약도 OCR 텍스트 서명으로 갱신)
+    if not doc["cheap_text"]:
+        full_text = "\n".join(p.page_content for p in pages)
+        dup_of, similarity, _ = dedupe.reserve_document(fname, doc["sha256"], full_text)
+        if dup_of:
+            print(f" 중복 문서(OCR 후), 스킵: {fname} ≈ {dup_of} (유사도 {similarity:.2f})")
+            dedupe.release_document(fname)
+            dedupe.record_skip(False, 0, 0, estimate_chunks(full_text, len(pages)))
+            mark_processed(fname)
+            return None
+    return pages
+
+def index_pages(doc: dict, pages: list, dedupe: DedupeStore) -> int:
+    """청크 생성 → 중복 청크 제거 → 업서트. 업로드한 청크 수 반환"""
+    try:
+        return _index_pages(doc, pages, dedupe)
+    except Exception:
+        # 업서트 도중 실패 → 예약을 풀어 다음 실행(또는 다른 사본)이 다시 처리
+        dedupe.release_document(doc["fname"])
+        raise
+
+def _index_pages(doc: dict, pages: list, dedupe: DedupeStore) -> int:
+    fname = doc["fname"]
+    text = doc["cheap_text"] or "\n".join(p.page_content for p in pages)
+    doc_tags = infer_tags(text, doc.get("keyword"))
+    # Pinecone 메타데이터는 null을 허용하지 않으므로 값이 있을 때만 기록
+    source_info = {k: v for k, v in (("source_url", doc.get("url")), ("title", doc.get("title"))) if v}
+
+    # 6.5) 텍스트 청크 생성 (질병/주제 태그 → 검색 시 메타데이터 필터로 사용)
+    docs = []
+    for page_idx, page in enumerate(pages):
+        chunks = splitter.split_text(page.page_content)
+        for chunk_idx, chunk in enumerate(chunks):
+            docs.append(
+                Document(
+                    page_content=chunk,
+                    metadata={
+                        "source_file": fname,
+                        **source_info,
+                        "page": page_idx,
+                        "chunk": chunk_idx,
+                        **chunk_tags(chunk, doc_tags),
+                    }
                 )
-        if not docs:
-            print(f" 생성된 청크 없음, 스킵: {fname}")
-            processed_files.add(fname)
-            with open(PROCESSED_FILE, "a", encoding="utf-8") as f:
-                f.write(fname + "\n")
-            continue
-
-        # 6.5) 배치별 업로드
-        print(f" 인덱싱 중 ({len(docs)} 청크): {fname}")
-        for i in range(0, len(docs), BATCH_SIZE):
-            batch = docs[i : i + BATCH_SIZE]
-            vectorstore.add_documents(batch)
-            print(f"   배치 업로드: {i}~{i+len(batch)}")
-
-        # 6.6) 처리 완료 기록
-        processed_files.add(fname)
-        with open(PROCESSED_FILE, "a", encoding="utf-8") as f:
-            f.write(fname + "\n")
-        print(f" 처리 완료: {fname}")
-
-print(" 모든 파일 처리 및 인덱싱 완료")
+            )
+
+    # 6.6) 이미 업서트된 청크와 같거나 거의 같은 청크 제거
+    total = len(docs)
+    docs = dedupe.filter_chunks(fname, docs)
+    if len(docs) < total:
+        print(f" 중복 청크 {total - len(docs)}개 제거: {fname}")
+    if not docs:
+        print(f" 생성된 청크 없음, 스킵: {fname}")
+        dedupe.add_document(fname, doc["sha256"], text, len(pages), doc["size"])
+        mark_processed(fname)
+        return 0
+
+    # 6.7) 배치별 업로드
+    print(f" 인덱싱 중 ({len(docs)} 청크): {fname}")
+    for i in range(0, len(docs), BATCH_SIZE):
+        batch = docs[i : i + BATCH_SIZE]
+        vectorstore.add_documents(batch)
+        print(f"   배치 업로드: {i}~{i+len(batch)}")
+
+    # 6.8) 처리 완료 기록
+    dedupe.add_chunks(fname, docs)
+    dedupe.add_document(fname, doc["sha256"], text, len(pages), doc["size"])
+    mark_processed(fname)
+    print(f" 처리 완료: {fname}")
+    return len(docs)
+
+def index_pdf(pdf_path: str, dedupe: DedupeStore, keyword: str = None, url: str = None) -> int:
+    """PDF 1개 검증 → 중복 확인 → 파싱 → 청크 → 업로드. 업로드한 청크 수 반환"""
+    doc = validate_pdf(pdf_path, dedupe, keyword, url)
+    if doc is None:
+        return 0
+    pages = parse_pdf(doc, dedupe)
+    if pages is None:
+        return 0
+    return index_pages(doc, pages, dedupe)
+
+def file_keywords() -> dict:
+    """manifest.jsonl(URL→파일) + frontier.db(URL→검색 키워드) → {파일명: 키워드}"""
+    if not os.path.exists(FRONTIER_DB):
+        return {}
+    frontier = Frontier(FRONTIER_DB)
+    mapping = {entry["file"]: frontier.keyword_of(url)
+               for url, entry in load_manifest(PDF_DIR).items()}
+    frontier.close()
+    return mapping
+
+def file_urls() -> dict:
+    """manifest.jsonl → {파일명: 원본 URL}"""
+    return {entry["file"]: url for url, entry in load_manifest(PDF_DIR).items()}
+
+def main():
+    dedupe = DedupeStore()
+    keywords = file_keywords()
+    urls = file_urls()
+    for root, _, files in os.walk(PDF_DIR):
+        for fname in files:
+            if not fname.lower().endswith(".pdf"):
+                continue
+            if fname in processed_files:
+                print(f" 이미 처리됨, 스킵: {fname}")
+                continue
+            index_pdf(os.path.join(root, fname), dedupe, keywords.get(fname), urls.get(fname))
 
+    print(" 모든 파일 처리 및 인덱싱 완료")
+    print(" 중복 제거:", dedupe.report())
+    dedupe.close()
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+pipeline.py
+────────────────────────────────────────────────────────────────
+크롤링 → 인덱싱 → 요약 → 업로드를 한 번에 흘려보내는 스트리밍 파이프라인.
+
+  discover ─▶ download ─▶ validate ─▶ parse ─┬▶ index
+                                             └▶ summarize ─▶ upload
+
+• 단계마다 워커 수를 따로 두고, 단계 사이는 크기 제한 큐로 연결 (뒤가 밀리면 앞이 기다림)
+• PDF 하나가 준비되는 즉시 다음 단계로 넘어가므로, 발견 후 몇 분 안에 검색 가능
+• URL ↔ 파일 매핑은 단계 사이를 흐르는 item dict 로 유지 (downloaded_pdfs/manifest.jsonl 에도 기록)
+• 종료 시 단계별 처리량 리포트 출력
+• 기존 배치 스크립트(crawler.py / indexer.py / chunk_pdf_summarizer.py)와
+  같은 상태 파일(frontier.db, manifest.jsonl, dedupe.db, 체크포인트)을 쓰므로 재실행 시 이어서 처리
+
+• .env : UPSTAGE_API_KEY, PINECONE_API_KEY, PINECONE_ENV, BASE_URL, ACCESS_KEY
+실행 :  python pipeline.py [--keywords Cholera Measles] [--no-summary] [--no-upload] [--bulk]
+────────────────────────────────────────────────────────────────
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import statistics
+
+import aiohttp
+
+import crawler
+import indexer
+from downloader import PdfDownloader
+from dedupe import DedupeStore
+from frontier import Frontier
+
+QUEUE_SIZE = 16                # 단계 사이 큐 최대 길이
+STAGE_WORKERS = {
+    "download":  8,
+    "validate":  1,            # pypdf + dedupe.db – 가볍고 직렬화가 안전
+    "parse":     4,            # Upstage OCR API 대기 시간이 대부분
+    "index":     2,
+    "summarize": 2,
+    "upload":    1,            # 실제 동시성은 uploader 스레드 풀이 담당
+}
+
+_DONE = object()               # 큐 종료 표시
+
+
+class Stage:
+    """
+    inbox 큐에서 item을 꺼내 fn(item)을 실행하고 결과를 outputs 큐들로 전달.
+    fn이 None을 반환하면 item은 그 단계에서 걸러진다.
+    """
+
+    def __init__(self, name: str, fn, workers: int, outputs=()):
+        self.name    = name
+        self.fn      = fn
+        self.workers = workers
+        self.inbox   = asyncio.Queue(QUEUE_SIZE)
+        self.outputs = list(outputs)
+        self.stats   = {"in": 0, "out": 0, "dropped": 0, "errors": 0,
+                        "busy": 0.0, "max_queue": 0, "first": None, "last": None}
+
+    async def run(self):
+        await asyncio.gather(*(self._worker() for _ in range(self.workers)))
+        for out in self.outputs:
+            await out.put(_DONE)
+
+    async def _worker(self):
+        while True:
+            item = await self.inbox.get()
+            if item is _DONE:
+                await self.inbox.put(_DONE)          # 같은 단계의 다른 워커도 종료
+                return
+            self.stats["in"] += 1
+            self.stats["max_queue"] = max(self.stats["max_queue"], self.inbox.qsize() + 1)
+            started = time.perf_counter()
+            self.stats["first"] = self.stats["first"] or started
+            try:
+                result = await self.fn(item)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f" [{self.name}] 오류: {item.get('url', item.get('file'))} ({e})")
+                result = None
+            finally:
+                self.stats["busy"] += time.perf_counter() - started
+                self.stats["last"] = time.perf_counter()
+            if result is None:
+                self.stats["dropped"] += 1
+                continue
+            self.stats["out"] += 1
+            for out in self.outputs:
+                await out.put(result)
+
+
+class IngestPipeline:
+    def __init__(self, keywords, summarize: bool = True, upload: bool = True, bulk: bool = False):
+        self.keywords  = keywords
+        self.summarize = summarize
+        self.upload    = upload and summarize
+        self.bulk      = bulk
+        self.dedupe    = DedupeStore()
+        self.downloader = PdfDownloader(
+            crawler.OUTPUT_DIR, headers=crawler.HEADERS,
+            max_file_size=crawler.MAX_FILE_SIZE,
+        )
+        self.session   = None
+        self.uploader  = None
+        self.summarizer = None
+        self.searchable_latency = []         # 발견 → 인덱싱 완료 (초)
+
+    # ────── 단계 함수 ─────────────────────────────────────────
+    async def _download(self, item):
+        # 이전 실행에서 받아 두고 인덱싱 전에 멈춘 파일은 다시 받지 않음
+        entry = self.downloader.manifest.get(item["url"])
+        if entry is None:
+            entry = await self.downloader.download(self.session, item["url"])
+        if entry is None or entry.get("duplicate"):
+            return None
+        return {**item, "file": entry["file"], "sha256": entry["sha256"],
+                "path": os.path.join(crawler.OUTPUT_DIR, entry["file"])}
+
+    async def _validate(self, item):
+        doc = await asyncio.to_thread(indexer.validate_pdf, item["path"], self.dedupe,
+                                      item.get("keyword"), item["url"])
+        return {**item, "doc": doc} if doc else None
+
+    async def _parse(self, item):
+        try:
+            pages = await asyncio.to_thread(indexer.parse_pdf, item["doc"], self.dedupe)
+        except Exception:
+            # validate 단계에서 잡아 둔 중복 확인 예약 해제 (index 실패는 index_pages가 처리)
+            self.dedupe.release_document(item["doc"]["fname"])
+            raise
+        return {**item, "pages": pages} if pages else None
+
+    async def _index(self, item):
+        count = await asyncio.to_thread(indexer.index_pages, item["doc"], item["pages"], self.dedupe)
+        self.searchable_latency.append(time.time() - item["discovered_at"])
+        return {**item, "chunks": count}
+
+    async def _summarize(self, item):
+        info = await asyncio.to_thread(
+            lambda: self.summarizer.LLMService(item["path"]).summarize(item["pages"])
+        )
+        if not info:
+            return None
+        return {"url": item["url"], **info}
+
+    async def _upload(self, record):
+        self.summarizer.append_spool(record)
+        if self.uploader:
+            self.uploader.submit(record)
+        return record
+
+    # ────── 실행 ─────────────────────────────────────────────
+    async def run(self) -> dict:
+        started = time.perf_counter()
+        if self.summarize:
+            import chunk_pdf_summarizer
+            self.summarizer = chunk_pdf_summarizer
+        if self.upload:
+            from uploader import MedicalInfoUploader
+            self.uploader = MedicalInfoUploader.from_env(bulk=self.bulk)
+
+        upload    = Stage("upload", self._upload, STAGE_WORKERS["upload"])
+        summarize = Stage("summarize", self._summarize, STAGE_WORKERS["summarize"], [upload.inbox])
+        index     = Stage("index", self._index, STAGE_WORKERS["index"])
+        parse     = Stage("parse", self._parse, STAGE_WORKERS["parse"],
+                          [index.inbox] + ([summarize.inbox] if self.summarize else []))
+        validate  = Stage("validate", self._validate, STAGE_WORKERS["validate"], [parse.inbox])
+        download  = Stage("download", self._download, STAGE_WORKERS["download"], [validate.inbox])
+        stages = [download, validate, parse, index] + ([summarize, upload] if self.summarize else [])
+
+        connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.downloader.per_host_limit)
+        async with aiohttp.ClientSession(connector=connector, headers=self.downloader.headers,
+                                         timeout=self.downloader.timeout) as session:
+            self.session = session
+            discovered = await asyncio.gather(
+                self._discover(download.inbox),
+                *(stage.run() for stage in stages),
+            )
+
+        upload_stats = self.uploader.close() if self.uploader else None
+        self.dedupe.close()
+        return self._report(stages, discovered[0], time.perf_counter() - started, upload_stats)
+
+    async def _discover(self, queue: asyncio.Queue) -> int:
+        """
+        이전 실행에서 찾았지만 아직 받지 못한 링크부터 넣고,
+        프런티어 수집(블로킹)은 별도 스레드에서 돌리며 새 링크를 즉시 큐에 넣음
+        """
+        loop = asyncio.get_running_loop()
+        count = 0
+
+        frontier = Frontier()
+        manifest = self.downloader.manifest
+        backlog = [(u, frontier.keyword_of(u)) for u in frontier.links(self.keywords)
+                   if u not in manifest or manifest[u]["file"] not in indexer.processed_files]
+        frontier.close()
+        for url, kw in backlog:
+            await queue.put({"url": url, "keyword": kw, "discovered_at": time.time()})
+            count += 1
+
+        def crawl():
+            n = 0
+            for kw, urls in crawler.iter_pdf_links(self.keywords):
+                for url in urls:
+                    item = {"url": url, "keyword": kw, "discovered_at": time.time()}
+                    asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+                    n += 1
+            return n
+
+        count += await asyncio.to_thread(crawl)
+        await queue.put(_DONE)
+        return count
+
+    def _report(self, stages, discovered: int, elapsed: float, upload_stats) -> dict:
+        print("\n=== 파이프라인 처리량 ===")
+        print(f" 발견 링크 {discovered}개, 총 {elapsed:.1f}s")
+        print(f" {'stage':<10}{'in':>5}{'out':>5}{'drop':>6}{'err':>5}"
+              f"{'busy(s)':>9}{'avg(s)':>8}{'items/s':>9}{'maxQ':>6}")
+        report = {"discovered": discovered, "elapsed": elapsed, "stages": {}}
+        for st in stages:
+            s = st.stats
+            span = (s["last"] - s["first"]) if s["first"] else 0
+            avg = s["busy"] / s["in"] if s["in"] else 0
+            rate = s["out"] / span if span else 0
+            print(f" {st.name:<10}{s['in']:>5}{s['out']:>5}{s['dropped']:>6}{s['errors']:>5}"
+                  f"{s['busy']:>9.1f}{avg:>8.2f}{rate:>9.2f}{s['max_queue']:>6}")
+            report["stages"][st.name] = {**{k: v for k, v in s.items() if k not in ("first", "last")},
+                                         "avg_seconds": avg, "items_per_second": rate}
+        if self.searchable_latency:
+            med = statistics.median(self.searchable_latency)
+            print(f" 발견 → 검색 가능: 중앙값 {med:.1f}s, 최대 {max(self.searchable_latency):.1f}s")
+            report["time_to_searchable_median"] = med
+        print(" 다운로드:", json.dumps(self.downloader.stats, ensure_ascii=False))
+        print(" 중복 제거:", self.dedupe.report())
+        if upload_stats:
+            print(" 업로드:", json.dumps(upload_stats, ensure_ascii=False))
+        report["download"], report["dedupe"], report["upload"] = (
+            self.downloader.stats, self.dedupe.stats, upload_stats)
+        return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="크롤링→인덱싱→요약→업로드 스트리밍 파이프라인")
+    parser.add_argument("--keywords", nargs="*", default=crawler.KEYWORDS)
+    parser.add_argument("--no-summary", action="store_true", help="인덱싱까지만 수행")
+    parser.add_argument("--no-upload", action="store_true", help="요약은 스풀에만 기록")
+    parser.add_argument("--bulk", action="store_true", help="/medical-info/bulk 로 업로드")
+    args = parser.parse_args()
+
+    pipeline = IngestPipeline(args.keywords, summarize=not args.no_summary,
+                              upload=not args.no_upload, bulk=args.bulk)
+    asyncio.run(pipeline.run())
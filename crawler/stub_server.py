@@ -0,0 +1,179 @@
+"""
+stub_server.py
+────────────────────────────────────────────────────────────────
+로컬 테스트용 가짜 medical-info API 서버 (표준 라이브러리만 사용).
+• POST /medical-info       : { json: {...} }
+• POST /medical-info/bulk  : { items: [{ json: {...} }, ...] }
+• GET  /stats              : 수신/중복/실패 주입 통계
+• GET  /pdfs/<name>        : 이름으로 결정되는 가짜 PDF (Range 지원, downloader.py 테스트용)
+                             <name>이 .html로 끝나면 text/html 응답
+--fail-rate 로 일정 비율의 503을 돌려 재시도 동작을 확인할 수 있다.
+--drop-rate 로 PDF 전송을 중간에 끊어 이어받기(Range) 동작을 확인할 수 있다.
+같은 Idempotency-Key로 다시 들어온 요청은 저장하지 않고 201을 돌려준다
+(backend/routes/medical_info.js 의 medical_info_idempotency 처리와 동일).
+
+실행 :  python stub_server.py --port 8765 --fail-rate 0.2
+────────────────────────────────────────────────────────────────
+"""
+import json, time, random, hashlib, argparse, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def fake_pdf(name: str, size: int = 256 * 1024) -> bytes:
+    """이름으로 결정되는 PDF 시그니처 + 의사 난수 본문"""
+    body = bytearray(b"%PDF-1.4\n")
+    seed = name.encode("utf-8")
+    while len(body) < size:
+        seed = hashlib.sha256(seed).digest()
+        body += seed
+    return bytes(body[:size])
+
+
+class StubState:
+    def __init__(self, fail_rate: float = 0.0, latency: float = 0.0, drop_rate: float = 0.0):
+        self.fail_rate = fail_rate
+        self.latency   = latency
+        self.drop_rate = drop_rate
+        self.lock      = threading.Lock()
+        self.records   = []
+        self.keys      = set()
+        self.stats     = {"requests": 0, "stored": 0, "duplicates": 0, "injected_failures": 0,
+                          "pdf_requests": 0, "range_requests": 0, "dropped": 0}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"        # keep-alive 재사용 확인용
+    state: StubState = None
+
+    # ────── 응답 헬퍼 ─────────────────────────────────────────
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def log_message(self, fmt, *args):
+        pass
+
+    # ────── 라우트 ────────────────────────────────────────────
+    def do_GET(self):
+        if self.path == "/stats":
+            with self.state.lock:
+                body = {**self.state.stats, "records": len(self.state.records)}
+            return self._send_json(200, body)
+        if self.path.startswith("/pdfs/"):
+            return self._send_pdf(self.path[len("/pdfs/"):])
+        self._send_json(404, {"success": False, "error": "not found"})
+
+    def _send_pdf(self, name: str):
+        state = self.state
+        if name.endswith(".html"):
+            raw = b"<html><body>not a pdf</body></html>"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+            return
+
+        data, start = fake_pdf(name), 0
+        rng = self.headers.get("Range", "")
+        with state.lock:
+            state.stats["pdf_requests"] += 1
+            if rng:
+                state.stats["range_requests"] += 1
+        if rng.startswith("bytes="):
+            start = int(rng[len("bytes="):].split("-")[0] or 0)
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        body = data[start:]
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        if random.random() < state.drop_rate:
+            # 절반만 보내고 연결 종료 → 클라이언트는 Range로 이어받아야 함
+            with state.lock:
+                state.stats["dropped"] += 1
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def do_POST(self):
+        state = self.state
+        body  = self._read_json()
+        if state.latency:
+            time.sleep(state.latency)
+
+        with state.lock:
+            state.stats["requests"] += 1
+            if random.random() < state.fail_rate:
+                state.stats["injected_failures"] += 1
+                return self._send_json(503, {"success": False, "error": "injected"},
+                                       {"Retry-After": "0"})
+
+        if self.path == "/medical-info":
+            items = [body] if body.get("json") else []
+        elif self.path == "/medical-info/bulk":
+            items = body.get("items") or []
+        else:
+            return self._send_json(404, {"success": False, "error": "not found"})
+        if not items or any(not item.get("json") for item in items):
+            return self._send_json(400, {"success": False, "error": "json 필드는 필수입니다."})
+
+        key = self.headers.get("Idempotency-Key")
+        with state.lock:
+            replayed = bool(key and key in state.keys)
+            if replayed:
+                state.stats["duplicates"] += 1
+            else:
+                if key:
+                    state.keys.add(key)
+                state.records.extend(item["json"] for item in items)
+                state.stats["stored"] += len(items)
+            count = len(state.records)
+        self._send_json(201, {"success": True, "replayed": replayed,
+                              "data": {"count": len(items), "total": count}})
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8765, **state_kwargs) -> ThreadingHTTPServer:
+    """테스트 코드에서 스레드로 띄울 수 있도록 서버 객체 반환"""
+    handler = type("BoundStubHandler", (StubHandler,), {"state": StubState(**state_kwargs)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="medical-info API 로컬 스텁 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, fail_rate=args.fail_rate,
+                         latency=args.latency, drop_rate=args.drop_rate)
+    print(f" 스텁 서버 실행 중: http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,98 @@
+"""
+tags.py
+────────────────────────────────────────────────────────────────
+벡터 메타데이터용 질병/주제 태그 사전.
+• 인덱서가 청크 메타데이터에 diseases / topics 리스트를 붙이는 데 사용
+• rag-server 의 config.DISEASE_ALIASES 와 같은 표준 이름(cholera, measles ...)을 써야
+  질문의 필터(disease=cholera)가 Pinecone 메타데이터 필터로 그대로 내려간다
+────────────────────────────────────────────────────────────────
+"""
+import re
+
+# 표준 질병 이름 → 본문에서 찾을 별칭 (소문자)
+DISEASE_ALIASES = {
+    "measles":               ["measles", "rubeola", "홍역"],
+    "cholera":               ["cholera", "vibrio cholerae", "콜레라"],
+    "hepatitis_a":           ["hepatitis a", "hav infection", "a형 간염"],
+    "malaria":               ["malaria", "plasmodium", "말라리아"],
+    "diarrhoea":             ["diarrhoea", "diarrhea", "diarrheal", "diarrhoeal", "설사"],
+    "diphtheria":            ["diphtheria", "corynebacterium diphtheriae", "디프테리아"],
+    "respiratory_infection": ["respiratory infection", "respiratory tract infection",
+                              "pneumonia", "호흡기 감염", "폐렴"],
+    "trauma":                ["trauma", "injury", "injuries", "외상"],
+    "burn":                  ["burn", "burns", "화상"],
+}
+
+# 표준 주제 이름 → 별칭
+TOPIC_ALIASES = {
+    "treatment":    ["treatment", "therapy", "therapeutic", "치료"],
+    "vaccination":  ["vaccine", "vaccination", "immunization", "immunisation", "백신", "예방접종"],
+    "diagnosis":    ["diagnosis", "diagnostic", "rapid test", "진단"],
+    "epidemiology": ["outbreak", "incidence", "prevalence", "epidemiology", "epidemiological",
+                     "유행", "역학"],
+    "prevention":   ["prevention", "prophylaxis", "sanitation", "예방"],
+    "pediatrics":   ["children", "child", "infant", "paediatric", "pediatric", "소아"],
+}
+
+# crawler.KEYWORDS 검색어 → 표준 질병 이름 (검색어로 찾은 논문은 해당 질병 태그를 항상 가짐)
+KEYWORD_DISEASE = {
+    "Measles": "measles",
+    "Cholera": "cholera",
+    "Hepatitis A": "hepatitis_a",
+    "Malaria": "malaria",
+    "Acute Watery Diarrhoea": "diarrhoea",
+    "Diphtheria": "diphtheria",
+    "Respiratory Infections": "respiratory_infection",
+    "Diarrheal Diseases": "diarrhoea",
+    "Trauma Care": "trauma",
+    "Burn Treatment": "burn",
+}
+
+MIN_DOC_MENTIONS   = 3     # 문서 전체에서 이만큼 언급되어야 문서 태그로 인정
+MIN_CHUNK_MENTIONS = 1
+
+
+def _alias_pattern(words) -> re.Pattern:
+    """
+    별칭 중 하나와 단어 단위로 일치하는 패턴 (긴 별칭 우선 → 겹치는 구간은 한 번만 셈).
+    "burnout"은 burn, "children"은 child로 잡히지 않는다.
+    한글 별칭은 뒤에 조사가 붙으므로("콜레라가") 앞쪽 경계만 본다.
+    """
+    parts = [re.escape(w) + (r"\b" if w[-1].isascii() else "")
+             for w in sorted(words, key=len, reverse=True)]
+    return re.compile(r"\b(?:" + "|".join(parts) + ")")
+
+
+_DISEASE_PATTERNS = {name: _alias_pattern(words) for name, words in DISEASE_ALIASES.items()}
+_TOPIC_PATTERNS   = {name: _alias_pattern(words) for name, words in TOPIC_ALIASES.items()}
+
+
+def _count(text: str, patterns: dict) -> dict:
+    lowered = text.lower()
+    counts = {}
+    for name, pattern in patterns.items():
+        n = len(pattern.findall(lowered))
+        if n:
+            counts[name] = n
+    return counts
+
+
+def infer_tags(text: str, keyword: str = None, min_mentions: int = MIN_DOC_MENTIONS) -> dict:
+    """텍스트에서 질병/주제 태그 추출 → {"diseases": [...], "topics": [...]}"""
+    diseases = {k for k, n in _count(text, _DISEASE_PATTERNS).items() if n >= min_mentions}
+    topics   = {k for k, n in _count(text, _TOPIC_PATTERNS).items() if n >= min_mentions}
+    if keyword in KEYWORD_DISEASE:
+        diseases.add(KEYWORD_DISEASE[keyword])
+    return {"diseases": sorted(diseases), "topics": sorted(topics)}
+
+
+def chunk_tags(text: str, doc_tags: dict) -> dict:
+    """
+    청크 태그 = 문서 태그 ∪ 청크 안에서 직접 언급된 태그.
+    문서 태그를 물려받아야 '콜레라 논문의 방법론 청크'도 disease=cholera 필터에 걸린다.
+    """
+    own = infer_tags(text, min_mentions=MIN_CHUNK_MENTIONS)
+    return {
+        "diseases": sorted(set(doc_tags["diseases"]) | set(own["diseases"])),
+        "topics":   sorted(set(doc_tags["topics"]) | set(own["topics"])),
+    }
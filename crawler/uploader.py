@@ -0,0 +1,254 @@
+"""
+uploader.py
+────────────────────────────────────────────────────────────────
+요약 결과(JSON dict)를 medical-info API로 업로드하는 스테이지.
+• 요약기가 쓰는 JSONL 스풀(./new_pdfs/summaries.jsonl)을 tail 하면서
+  요약이 생성되는 즉시 업로드 (전체 요약이 끝날 때까지 기다리지 않음)
+• keep-alive 세션 풀 + 동시 요청 수 제한 + 지수 백오프 재시도
+• URL / 내용 해시 기준 중복 제거 (uploaded.txt 원장으로 재실행에도 유지)
+• --bulk : POST {BASE_URL}/medical-info/bulk 로 여러 건을 한 번에 전송
+
+• .env : BASE_URL, ACCESS_KEY
+실행 :  python uploader.py --spool ./new_pdfs/summaries.jsonl [--follow] [--bulk]
+테스트: python stub_server.py 실행 후 BASE_URL=http://127.0.0.1:8765
+────────────────────────────────────────────────────────────────
+"""
+import os, json, time, random, hashlib, argparse, threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+SPOOL_FILE  = "./new_pdfs/summaries.jsonl"
+LEDGER_FILE = "./new_pdfs/uploaded.txt"
+
+# 재시도할 상태 코드 (그 외 4xx는 요청 자체의 문제이므로 즉시 실패 처리)
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def content_hash(rec: dict) -> str:
+    """레코드 내용 해시 (키 순서와 무관, 출처 url 제외 → 미러 URL의 같은 요약도 중복으로 잡음)"""
+    body = {k: v for k, v in rec.items() if k != "url"}
+    raw = json.dumps(body, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MedicalInfoUploader:
+    """스레드 풀 기반 medical-info 업로더"""
+
+    def __init__(self, base_url: str, access_key: str, concurrency: int = 4,
+                 bulk: bool = False, bulk_size: int = 20, max_retries: int = 5,
+                 backoff_base: float = 0.5, timeout: float = 10,
+                 ledger_path: str = LEDGER_FILE):
+        self.base_url     = base_url.rstrip("/")
+        self.bulk         = bulk
+        self.bulk_size    = bulk_size
+        self.max_retries  = max_retries
+        self.backoff_base = backoff_base
+        self.timeout      = timeout
+        self.ledger_path  = ledger_path
+
+        # ① keep-alive 세션 (동시성만큼 커넥션 풀 확보)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "accesskey": access_key,           # Postman spec에 맞춰서
+        })
+
+        # ② 동시 요청 수 제한
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.futures  = []
+
+        # ③ 중복 제거 원장 (url, 내용 해시)
+        self.lock     = threading.Lock()
+        self.seen_urls, self.seen_hashes = set(), set()
+        if os.path.exists(ledger_path):
+            with open(ledger_path, encoding="utf-8") as f:
+                for line in f:
+                    url, _, digest = line.rstrip("\n").partition("\t")
+                    if url:
+                        self.seen_urls.add(url)
+                    if digest:
+                        self.seen_hashes.add(digest)
+
+        self.buffer = []
+        self.stats  = {"submitted": 0, "uploaded": 0, "duplicates": 0,
+                       "failed": 0, "retries": 0, "requests": 0}
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "MedicalInfoUploader":
+        load_dotenv()
+        base_url   = os.getenv("BASE_URL")
+        access_key = os.getenv("ACCESS_KEY")
+        assert base_url and access_key, "BASE_URL과 ACCESS_KEY를 .env에 설정하세요."
+        return cls(base_url, access_key, **kwargs)
+
+    # ────── 공개 메서드 ───────────────────────────────────────
+    def submit(self, rec: dict):
+        """레코드 1건 업로드 예약 (중복이면 무시)"""
+        url, digest = rec.get("url", ""), content_hash(rec)
+        with self.lock:
+            if (url and url in self.seen_urls) or digest in self.seen_hashes:
+                self.stats["duplicates"] += 1
+                return
+            # 업로드 진행 중인 건도 중복으로 취급 (실패 시 되돌림)
+            if url:
+                self.seen_urls.add(url)
+            self.seen_hashes.add(digest)
+            self.stats["submitted"] += 1
+
+            if self.bulk:
+                self.buffer.append((rec, digest))
+                if len(self.buffer) < self.bulk_size:
+                    return
+                batch, self.buffer = self.buffer, []
+                self.futures.append(self.executor.submit(self._upload_bulk, batch))
+            else:
+                self.futures.append(self.executor.submit(self._upload_one, rec, digest))
+
+    def flush(self):
+        """bulk 버퍼에 남은 레코드 전송"""
+        with self.lock:
+            batch, self.buffer = self.buffer, []
+        if batch:
+            self.futures.append(self.executor.submit(self._upload_bulk, batch))
+
+    def follow(self, spool_path: str, stop_event: threading.Event = None, poll: float = 1.0):
+        """
+        JSONL 스풀을 tail 하며 새 레코드를 업로드.
+        stop_event가 없으면 현재 파일 끝까지만 읽고 종료,
+        있으면 이벤트가 설정되고 파일 끝에 도달할 때까지 대기하며 계속 읽음.
+        """
+        while not os.path.exists(spool_path):
+            if stop_event is None or stop_event.is_set():
+                return
+            time.sleep(poll)
+
+        with open(spool_path, encoding="utf-8") as f:
+            pending = ""
+            while True:
+                line = f.readline()
+                if line:
+                    pending += line
+                    if not pending.endswith("\n"):
+                        continue                # 아직 쓰는 중인 줄
+                    line, pending = pending.strip(), ""
+                    if not line:
+                        continue
+                    try:
+                        self.submit(json.loads(line))
+                    except json.JSONDecodeError as e:
+                        print(f" 스풀 파싱 실패, 스킵: {e}")
+                    continue
+                if stop_event is None or stop_event.is_set():
+                    break
+                self.flush()                    # 대기 중에는 모인 만큼 먼저 전송
+                time.sleep(poll)
+        self.flush()
+
+    def close(self) -> dict:
+        """남은 작업을 모두 마치고 통계 반환"""
+        self.flush()
+        wait(self.futures)
+        self.executor.shutdown(wait=True)
+        self.session.close()
+        return self.stats
+
+    # ────── 내부 메서드 ───────────────────────────────────────
+    def _upload_one(self, rec: dict, digest: str):
+        ok = self._post("/medical-info", {"json": rec}, digest)
+        self._finish([(rec, digest)], ok)
+
+    def _upload_bulk(self, batch: list):
+        body = {"items": [{"json": rec} for rec, _ in batch]}
+        key  = hashlib.sha256("".join(d for _, d in batch).encode()).hexdigest()
+        ok = self._post("/medical-info/bulk", body, key)
+        self._finish(batch, ok)
+
+    def _post(self, path: str, body: dict, idempotency_key: str) -> bool:
+        """지수 백오프(+jitter)로 재시도하는 POST. 성공 여부 반환"""
+        for attempt in range(self.max_retries + 1):
+            delay = self.backoff_base * (2 ** attempt) * (1 + random.random())
+            try:
+                with self.lock:
+                    self.stats["requests"] += 1
+                resp = self.session.post(
+                    f"{self.base_url}{path}",
+                    json=body,
+                    headers={"Idempotency-Key": idempotency_key},
+                    timeout=self.timeout,
+                )
+                if resp.ok:
+                    return True
+                if resp.status_code not in RETRY_STATUS:
+                    print(f" 저장 실패 ({resp.status_code}): {resp.text[:200]}")
+                    return False
+                retry_after = resp.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+            except requests.RequestException as e:
+                print(f" 요청 오류 ({e.__class__.__name__}), 재시도 {attempt + 1}/{self.max_retries}")
+            if attempt < self.max_retries:
+                with self.lock:
+                    self.stats["retries"] += 1
+                time.sleep(delay)
+        return False
+
+    def _finish(self, batch: list, ok: bool):
+        with self.lock:
+            if ok:
+                self.stats["uploaded"] += len(batch)
+                with open(self.ledger_path, "a", encoding="utf-8") as f:
+                    for rec, digest in batch:
+                        f.write(f"{rec.get('url', '')}\t{digest}\n")
+                for rec, _ in batch:
+                    print(f" 저장 성공: {rec.get('title', 'unknown')}")
+            else:
+                # 다음 실행에서 다시 시도할 수 있도록 중복 표시 해제
+                self.stats["failed"] += len(batch)
+                for rec, digest in batch:
+                    self.seen_urls.discard(rec.get("url", ""))
+                    self.seen_hashes.discard(digest)
+                    print(f" 저장 실패: {rec.get('title', 'unknown')}")
+
+
+def start_background_upload(spool_path: str = SPOOL_FILE, **kwargs):
+    """
+    요약기와 같은 프로세스에서 스풀을 따라가며 업로드하는 스레드 시작.
+    반환된 stop()을 호출하면 남은 레코드까지 업로드한 뒤 통계를 반환한다.
+    """
+    uploader = MedicalInfoUploader.from_env(**kwargs)
+    stop_event = threading.Event()
+    thread = threading.Thread(target=uploader.follow, args=(spool_path, stop_event), daemon=True)
+    thread.start()
+
+    def stop() -> dict:
+        stop_event.set()
+        thread.join()
+        return uploader.close()
+
+    return stop
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="요약 JSONL 스풀을 medical-info API로 업로드")
+    parser.add_argument("--spool", default=SPOOL_FILE)
+    parser.add_argument("--follow", action="store_true", help="Ctrl+C 전까지 스풀을 계속 tail")
+    parser.add_argument("--bulk", action="store_true", help="/medical-info/bulk 엔드포인트 사용")
+    parser.add_argument("--bulk-size", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    uploader = MedicalInfoUploader.from_env(
+        concurrency=args.concurrency, bulk=args.bulk, bulk_size=args.bulk_size,
+    )
+    stop_event = threading.Event() if args.follow else None
+    try:
+        uploader.follow(args.spool, stop_event)
+    except KeyboardInterrupt:
+        pass
+    print(" 업로드 통계:", json.dumps(uploader.close(), ensure_ascii=False))
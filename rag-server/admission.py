@@ -0,0 +1,206 @@
+"""
+admission.py
+────────────────────────────────────────────────────────────────
+LLMService.get_streaming_answer 앞단의 입장 제어 (admission control).
+• 전역 동시 처리 상한 (MAX_INFLIGHT) – Upstage / Pinecone / CPU reranker 보호
+• clientId별 토큰 버킷 – 한 사용자가 연속 질문으로 슬롯을 독점하지 못하게 함
+• 크기 제한 우선순위 대기열 – emergency > normal > low 순으로 빈 슬롯을 넘겨줌
+  대기열이 가득 차면 더 낮은 우선순위 대기 요청을 밀어내고(shed), 그래도 자리가 없으면
+  즉시 AdmissionRejected(retry_after) → 호출 측이 busy 메시지로 응답
+• 여러 슬롯이 필요한 요청(/batch)은 필요한 수가 한꺼번에 빌 때만 입장 (일부만 쥐고 기다리지 않음)
+• snapshot() : 동시 처리 수, 대기열 길이, 사유별 거절 수, 평균 대기/처리 시간
+────────────────────────────────────────────────────────────────
+"""
+import time
+import heapq
+import asyncio
+import itertools
+from typing import Dict, Optional
+from contextlib import asynccontextmanager
+
+PRIORITIES = {"emergency": 0, "normal": 1, "low": 2}
+MAX_BUCKETS = 10000          # 토큰 버킷 보관 상한 (넘으면 가득 찬 버킷부터 정리)
+
+
+class AdmissionRejected(Exception):
+    """요청을 받을 수 없음 – reason: rate_limited / queue_full / shed"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"{reason} (retry after {retry_after:.1f}s)")
+        self.reason = reason
+        self.retry_after = round(retry_after, 1)
+
+
+class ClientBucket:
+    """clientId별 토큰 버킷 (rate 개/초, 최대 burst개)"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate    = rate
+        self.burst   = burst
+        self.tokens  = burst
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """토큰을 얻으면 0, 아니면 다음 토큰까지 남은 초"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def refund(self):
+        """입장하지 못한 요청의 토큰 반환 (처리되지 않은 요청이 한도를 깎지 않도록)"""
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def is_full(self) -> bool:
+        return self.tokens + (time.monotonic() - self.updated) * self.rate >= self.burst
+
+
+class AdmissionController:
+    def __init__(self, max_inflight: int, queue_size: int, client_rate: float, client_burst: float,
+                 default_service_time: float = 5.0):
+        self.max_inflight = max_inflight
+        self.queue_size   = queue_size
+        self.client_rate  = client_rate
+        self.client_burst = client_burst
+        self.inflight     = 0
+        self.waiters      = []                       # heap: (priority, seq, future, slots)
+        self.buckets: Dict[str, ClientBucket] = {}
+        self.seq          = itertools.count()
+        self.service_time = default_service_time     # 처리 시간 지수이동평균 (retry-after 추정용)
+        self.stats = {
+            "admitted": 0,
+            "queued": 0,
+            "rejected": {},                          # 사유별 거절 수
+            "max_queue_depth": 0,
+            "avg_wait_ms": 0.0,
+        }
+
+    # ────── 입장 / 퇴장 ───────────────────────────────────────
+    @asynccontextmanager
+    async def slot(self, client_id: str, priority: Optional[str] = None):
+        """
+        async with admission.slot(client_id, "emergency"): ...
+        입장하지 못하면 AdmissionRejected, 대기 중 Task가 취소되면 대기열에서 빠진다.
+        """
+        await self.acquire(client_id, priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.service_time = 0.8 * self.service_time + 0.2 * (time.monotonic() - started)
+            self.release()
+
+    async def acquire(self, client_id: str, priority: Optional[str] = None, slots: int = 1):
+        """
+        슬롯 slots개를 한 번에 확보 (배치처럼 한 요청이 여러 생성을 동시에 돌릴 때, 최대 max_inflight개).
+        일부만 잡고 나머지를 기다리면 배치끼리 슬롯을 나눠 쥔 채 서로 기다릴 수 있으므로
+        대기열 항목 하나로 기다리다가 slots개가 모두 비었을 때만 입장한다.
+        토큰 버킷은 요청당 한 번만 차감하고, 입장하지 못하면 토큰을 돌려준다.
+        """
+        level = PRIORITIES.get(priority, PRIORITIES["normal"])
+        slots = max(1, min(slots, self.max_inflight))
+
+        bucket = self._bucket(client_id)
+        wait = bucket.try_acquire()
+        if wait:
+            self._reject("rate_limited")
+            raise AdmissionRejected("rate_limited", wait)
+
+        try:
+            await self._take(level, slots)
+        except AdmissionRejected:
+            bucket.refund()
+            raise
+
+    async def _take(self, level: int, slots: int):
+        if not self.waiters and self.inflight + slots <= self.max_inflight:
+            self.inflight += slots
+            self.stats["admitted"] += 1
+            return
+
+        if len(self.waiters) >= self.queue_size and not self._shed_below(level):
+            self._reject("queue_full")
+            raise AdmissionRejected("queue_full", self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (level, next(self.seq), future, slots)
+        heapq.heappush(self.waiters, entry)
+        self.stats["queued"] += 1
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self.waiters))
+        queued_at = time.monotonic()
+        self._grant()                                # 앞에서 막힌 배치보다 우선순위가 높으면 바로 입장
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # 슬롯을 넘겨받은 직후 취소됨 → 다음 대기자에게 다시 넘김
+                self.release(slots)
+            elif entry in self.waiters:
+                self.waiters.remove(entry)
+                heapq.heapify(self.waiters)
+                self._grant()                        # 막고 있던 항목이 빠졌으면 뒤 대기자 입장
+            raise
+        waited_ms = (time.monotonic() - queued_at) * 1000
+        self.stats["avg_wait_ms"] = round(0.9 * self.stats["avg_wait_ms"] + 0.1 * waited_ms, 1)
+        self.stats["admitted"] += 1
+
+    def release(self, slots: int = 1):
+        """슬롯 반환 후 대기열 앞에서부터 자리가 나는 만큼 입장시킴"""
+        self.inflight -= slots
+        self._grant()
+
+    def _grant(self):
+        """
+        우선순위 순서대로 입장. 맨 앞 항목의 slots가 아직 안 비었으면 거기서 멈춘다
+        (뒤의 작은 요청이 계속 끼어들어 배치가 굶지 않도록).
+        """
+        while self.waiters:
+            _, _, future, slots = self.waiters[0]
+            if future.done():
+                heapq.heappop(self.waiters)
+                continue
+            if self.inflight + slots > self.max_inflight:
+                return
+            heapq.heappop(self.waiters)
+            self.inflight += slots
+            future.set_result(True)
+
+    # ────── 내부 ─────────────────────────────────────────────
+    def _shed_below(self, level: int) -> bool:
+        """대기열에서 level보다 낮은 우선순위 중 가장 늦게 온 요청을 밀어냄"""
+        victim = max(self.waiters, key=lambda e: (e[0], e[1]))
+        if victim[0] <= level:
+            return False
+        self.waiters.remove(victim)
+        heapq.heapify(self.waiters)
+        victim[2].set_exception(AdmissionRejected("shed", self.retry_after()))
+        self._reject("shed")
+        return True
+
+    def _bucket(self, client_id: str) -> ClientBucket:
+        bucket = self.buckets.get(client_id)
+        if bucket is None:
+            if len(self.buckets) >= MAX_BUCKETS:
+                self.buckets = {k: b for k, b in self.buckets.items() if not b.is_full()}
+            bucket = self.buckets[client_id] = ClientBucket(self.client_rate, self.client_burst)
+        return bucket
+
+    def _reject(self, reason: str):
+        self.stats["rejected"][reason] = self.stats["rejected"].get(reason, 0) + 1
+
+    def retry_after(self) -> float:
+        """지금 대기열이 모두 빠질 때까지의 예상 시간 (초)"""
+        return max(1.0, self.service_time * (len(self.waiters) + 1) / self.max_inflight)
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "queue_depth": len(self.waiters),
+            "queue_size": self.queue_size,
+            "avg_service_seconds": round(self.service_time, 2),
+        }
@@ -7,6 +7,7 @@ class Config:
     # API 키 설정
     UPSTAGE_API_KEY: str = "{UPSTAGE_API_KEY}"
     PINECONE_API_KEY: str = "{PINECONE_API_KEY}"
+    ADMIN_TOKEN: str = ""  # 비어 있으면 /admin 엔드포인트 비활성
     
     # Pinecone 설정
     PINECONE_INDEX_NAME: str = "ngo-medical"
@@ -14,9 +15,94 @@ class Config:
     # LLM 설정
     UPSTAGE_MODEL: str = "solar-pro"
     EMBEDDING_MODEL: str = "embedding-query"
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
     
     # 검색 설정
     RETRIEVAL_K: int = 10  # 검색할 문서 개수
+    RERANK_TOP_N: int = 3  # reranking 후 컨텍스트로 쓸 문서 개수
+    MIN_FILTERED_RESULTS: int = 3  # 메타데이터 필터 검색 결과가 이보다 적으면 전체 인덱스로 재검색
+    
+    # 질문에서 질병 필터를 추론할 별칭 (crawler/tags.py 의 표준 이름과 동일해야 함)
+    DISEASE_ALIASES: dict = {
+        "measles": ["measles", "rubeola", "홍역"],
+        "cholera": ["cholera", "콜레라"],
+        "hepatitis_a": ["hepatitis a", "a형 간염", "a형간염"],
+        "malaria": ["malaria", "plasmodium", "말라리아"],
+        "diarrhoea": ["diarrhoea", "diarrhea", "설사"],
+        "diphtheria": ["diphtheria", "디프테리아"],
+        "respiratory_infection": ["respiratory infection", "pneumonia", "호흡기 감염", "폐렴"],
+        "trauma": ["trauma", "외상"],
+        "burn": ["burn", "화상"],
+    }
+    
+    # 주제 표준 이름 → 별칭 (crawler/tags.py 의 TOPIC_ALIASES 와 같은 표준 이름)
+    TOPIC_ALIASES: dict = {
+        "treatment": ["treatment", "therapy", "치료"],
+        "vaccination": ["vaccine", "vaccination", "immunization", "백신", "예방접종"],
+        "diagnosis": ["diagnosis", "diagnostic", "진단"],
+        "epidemiology": ["outbreak", "epidemiology", "유행", "역학"],
+        "prevention": ["prevention", "prophylaxis", "예방"],
+        "pediatrics": ["children", "child", "pediatric", "paediatric", "소아"],
+    }
+    
+    # 질문 메시지 filters 에서 받을 키 → Pinecone 메타데이터 필드
+    FILTER_FIELDS: dict = {
+        "disease": "diseases",
+        "topic": "topics",
+    }
+    # 메타데이터 필드 → 명시 필터 값을 표준 이름으로 바꿀 때 쓰는 별칭 사전
+    FILTER_ALIASES: dict = {
+        "diseases": DISEASE_ALIASES,
+        "topics": TOPIC_ALIASES,
+    }
+    
+    # 요청 마감 (수신 → 첫 답변 토큰 예산, ms). 질문 메시지의 deadlineMs 가 있으면 그 값 사용
+    REQUEST_DEADLINE_MS: int = 6000
+    # 남은 예산이 아래 값보다 적으면 해당 단계를 축소/생략
+    CLASSIFY_MIN_BUDGET_MS: int = 4500      # LLM 분류 생략 → 문헌 검색으로 간주
+    FULL_K_MIN_BUDGET_MS: int = 3500        # 검색 개수 RETRIEVAL_K → DEGRADED_RETRIEVAL_K
+    FALLBACK_MIN_BUDGET_MS: int = 3000      # 필터 결과 부족 시 전체 인덱스 재검색 생략
+    FULL_RERANK_MIN_BUDGET_MS: int = 2500   # rerank 후보를 DEGRADED_RERANK_CANDIDATES개로 축소
+    RERANK_MIN_BUDGET_MS: int = 1200        # rerank 생략 → 벡터 검색 순서 사용
+    FULL_CONTEXT_MIN_BUDGET_MS: int = 800   # 컨텍스트 문서 수/길이 축소
+    RERANK_RESERVE_MS: int = 500            # rerank가 이 여유를 남기지 못하면 중단하고 벡터 순서 사용
+    RETRIEVAL_MIN_TIMEOUT_MS: int = 1000    # 임베딩+검색 제한 시간 하한 (남은 예산이 이보다 적어도 이만큼은 기다림)
+    DEGRADED_RETRIEVAL_K: int = 5
+    DEGRADED_RERANK_CANDIDATES: int = 5
+    DEGRADED_CONTEXT_DOCS: int = 2
+    DEGRADED_CONTEXT_CHARS: int = 1200
+    
+    # 배치 질의 (POST /batch)
+    BATCH_MAX_QUESTIONS: int = 64   # 요청 하나에 담을 수 있는 최대 질문 수
+    BATCH_CONCURRENCY: int = 4      # 배치 안에서 동시에 생성할 답변 수
+    
+    # 이벤트 루프 지연 감시 / 프로파일링 (profiling.py)
+    LOOP_LAG_THRESHOLD_MS: int = 200   # 루프가 이보다 오래 막히면 루프 스레드 스택을 로그로 남김
+    LOOP_LAG_INTERVAL: float = 0.05    # heartbeat 간격 (초)
+    PROFILE_INTERVAL: float = 0.005    # 샘플링 간격 (초)
+    PROFILE_MAX_SECONDS: int = 120     # 프로파일러 최대 실행 시간
+    PROFILE_DIR: str = "./profiles"    # folded stack 저장 위치
+    
+    # 업스트림 HTTP 연결 풀 (http_pool.py)
+    HTTP_MAX_CONNECTIONS: int = 20        # MAX_INFLIGHT + BATCH_CONCURRENCY 보다 넉넉하게
+    HTTP_MAX_KEEPALIVE: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 120.0  # 유휴 연결 유지 시간 (초)
+    HTTP_TIMEOUT: float = 60.0
+    HTTP_PREWARM_INTERVAL: float = 60.0   # 이만큼 요청이 없으면 연결 사전 준비 (KEEPALIVE_EXPIRY보다 짧게)
+    HTTP_PREWARM_URLS: list = ["https://api.upstage.ai/v1/models"]
+    # Pinecone 인덱스 클라이언트(urllib3)의 keep-alive 연결 풀 크기 – 동시에 도는 검색 스레드 수만큼
+    PINECONE_CONNECTION_POOL_MAXSIZE: int = 16
+    
+    # 취소된 답변이 아낀 토큰 추정용 평균 답변 길이 (완료된 답변이 쌓이면 실측 평균 사용)
+    EXPECTED_ANSWER_TOKENS: int = 600
+    
+    # 입장 제어 (admission.py)
+    MAX_INFLIGHT: int = 8           # 동시에 처리할 질문 수 (검색 + rerank + 생성)
+    ADMISSION_QUEUE_SIZE: int = 32  # 대기열 최대 길이 – 넘치면 busy 응답
+    CLIENT_RATE: float = 0.5        # clientId별 초당 질문 수
+    CLIENT_BURST: int = 3           # clientId별 연속 허용 질문 수
+    # 질문에 포함되면 emergency 우선순위로 처리할 단어 (질문 메시지의 priority 필드가 우선)
+    EMERGENCY_KEYWORDS: list = ["응급", "긴급", "emergency", "urgent", "triage", "쇼크", "shock"]
     
     # 서버 설정
     HOST: str = "0.0.0.0"
@@ -36,6 +122,11 @@ class Config:
         """환경 변수에서 Pinecone API 키를 가져오거나 기본값 사용"""
         return os.getenv("PINECONE_API_KEY", cls.PINECONE_API_KEY)
     
+    @classmethod
+    def get_admin_token(cls) -> str:
+        """환경 변수에서 관리자 토큰을 가져오거나 기본값 사용"""
+        return os.getenv("ADMIN_TOKEN", cls.ADMIN_TOKEN)
+    
     @classmethod
     def setup_environment(cls):
         """환경 변수 설정"""
@@ -0,0 +1,448 @@
+"""
+evaluate.py
+────────────────────────────────────────────────────────────────
+검색 설정(비용 ↔ 품질) 오프라인 평가 도구.
+• snapshot : Pinecone 인덱스를 로컬로 복사 (벡터 + 본문 + 메타데이터) → 이후 평가는 API/Pinecone 비용 없이 반복
+• silver   : 기록된 질문(텍스트 한 줄 = 질문 1개, 또는 rag-server 로그의 '질문 받음 ... 질문: ...' 줄)으로
+             넓은 검색(SILVER_K) + cross-encoder 상위 페이지를 정답으로 삼는 silver 라벨 생성
+             (평가하는 reranker와 같은 모델이 만든 라벨 → rerank 설정 점수는 자기 참조로 표시됨)
+• run      : 라벨 질의셋으로 설정 격자 (검색 k × rerank 여부 × 컨텍스트 top_n [× 재청크 size:overlap]) 평가
+             → recall / hit / MRR, 단계별 지연(ms), 컨텍스트 토큰 수, 품질 기준을 넘는 가장 싼 설정 추천
+
+라벨 JSONL 한 줄 : {"query": "...", "relevant": ["paper.pdf#3", "other.pdf"], "filters": {"disease": "cholera"}}
+  - "파일#페이지" 는 페이지 단위, 파일 이름만 있으면 문서 단위 정답 (재청크해도 라벨이 유지됨)
+  - filters 는 선택 (없으면 retrieval.py 규칙대로 질문에서 질병 필터 추론)
+
+• .env : UPSTAGE_API_KEY, PINECONE_API_KEY
+실행 :  python evaluate.py snapshot [--out eval/snapshot]
+        python evaluate.py silver --queries questions.log --out eval/silver.jsonl
+        python evaluate.py run --labels eval/labels.jsonl [--k 5 10 20] [--top-n 3 5] \\
+                               [--rechunk 1000:100 2000:200] [--min-recall 0.8]
+────────────────────────────────────────────────────────────────
+"""
+import os
+import re
+import json
+import math
+import time
+import sqlite3
+import hashlib
+import argparse
+import statistics
+
+import numpy as np
+
+from config import config
+from retrieval import resolve_filters, format_docs
+
+SNAPSHOT_DIR     = "./eval/snapshot"
+EMBED_CACHE      = "./eval/embeddings.db"
+REPORT_FILE      = "./eval/report.json"
+FETCH_BATCH      = 100           # Pinecone fetch 한 번에 가져올 벡터 수
+EMBED_BATCH      = 64            # 재청크 임베딩 배치 크기
+SILVER_K         = 50            # silver 라벨용 넓은 검색 개수
+SILVER_TOP       = 3             # rerank 상위 몇 페이지를 정답으로 볼지
+LOG_QUESTION     = re.compile(r"질문 받음 - 클라이언트 ID: .*?, 질문: (.+)$")
+
+
+def estimate_tokens(text: str) -> int:
+    """영문 논문 기준 대략 4자 ≈ 1토큰"""
+    return math.ceil(len(text) / 4)
+
+
+def page_key(meta: dict) -> str:
+    return f"{meta.get('source_file')}#{meta.get('page')}"
+
+
+# ──────────────────────────────────────────────────────────────
+# 1) 로컬 인덱스 스냅샷
+# ──────────────────────────────────────────────────────────────
+class Corpus:
+    """청크 본문/메타데이터 + 정규화된 임베딩 행렬 (brute-force cosine 검색)"""
+
+    def __init__(self, records: list, vectors: np.ndarray):
+        self.records = records
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = vectors / np.maximum(norms, 1e-12)
+
+    @classmethod
+    def load(cls, directory: str = SNAPSHOT_DIR) -> "Corpus":
+        with open(os.path.join(directory, "chunks.jsonl"), encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        vectors = np.load(os.path.join(directory, "vectors.npy"))
+        return cls(records, vectors.astype(np.float32, copy=False))
+
+    def search(self, vector, k: int, search_filter: dict = None) -> list:
+        """(record, score) 상위 k개. search_filter는 $in / $exists / 최상위 $or 만 지원"""
+        scores = self.vectors @ (np.asarray(vector, dtype=np.float32) / max(np.linalg.norm(vector), 1e-12))
+        if search_filter:
+            mask = np.array([self._matches(r, search_filter) for r in self.records], dtype=bool)
+            scores = np.where(mask, scores, -np.inf)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.records[i], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    @staticmethod
+    def _matches(record: dict, search_filter: dict) -> bool:
+        for field, cond in search_filter.items():
+            if field == "$or":
+                if not any(Corpus._matches(record, sub) for sub in cond):
+                    return False
+            elif isinstance(cond, dict) and "$exists" in cond:
+                if (field in record) != cond["$exists"]:
+                    return False
+            else:
+                wanted = set(cond.get("$in", [])) if isinstance(cond, dict) else {cond}
+                if not wanted & set(record.get(field) or []):
+                    return False
+        return True
+
+
+def snapshot_index(out_dir: str = SNAPSHOT_DIR) -> int:
+    """Pinecone 인덱스 전체를 out_dir/vectors.npy + chunks.jsonl 로 저장"""
+    from pinecone import Pinecone
+
+    index = Pinecone(api_key=config.get_pinecone_api_key()).Index(config.PINECONE_INDEX_NAME)
+    os.makedirs(out_dir, exist_ok=True)
+    records, vectors = [], []
+    for ids in index.list():
+        for start in range(0, len(ids), FETCH_BATCH):
+            fetched = index.fetch(ids=ids[start:start + FETCH_BATCH]).vectors
+            for vid, vec in fetched.items():
+                meta = dict(vec.metadata or {})
+                records.append({
+                    "id": vid,
+                    "text": meta.pop("text", ""),      # PineconeVectorStore 기본 text_key
+                    **meta,
+                })
+                vectors.append(vec.values)
+        print(f" 스냅샷 진행: {len(records)}개")
+    np.save(os.path.join(out_dir, "vectors.npy"), np.asarray(vectors, dtype=np.float32))
+    with open(os.path.join(out_dir, "chunks.jsonl"), "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(f" 스냅샷 완료: {len(records)}개 → {out_dir}")
+    return len(records)
+
+
+# ──────────────────────────────────────────────────────────────
+# 2) 임베딩 캐시 (재청크/질문 임베딩을 반복 실행해도 API는 한 번만 호출)
+# ──────────────────────────────────────────────────────────────
+class EmbeddingCache:
+    def __init__(self, path: str = EMBED_CACHE, model: str = config.EMBEDDING_MODEL):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn  = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        self.model = model
+        self.client = None
+        self.stats = {"hits": 0, "misses": 0, "api_calls": 0, "tokens": 0, "api_ms": 0.0}
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\n{text}".encode("utf-8")).hexdigest()
+
+    def embed(self, texts: list) -> np.ndarray:
+        keys = [self._key(t) for t in texts]
+        found = {}
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            marks = ",".join("?" * len(batch))
+            for key, blob in self.conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch
+            ):
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        missing = [(k, t) for k, t in zip(keys, texts) if k not in found]
+        self.stats["hits"] += len(texts) - len(missing)
+        self.stats["misses"] += len(missing)
+        if missing and self.client is None:
+            from langchain_upstage import UpstageEmbeddings
+            config.setup_environment()
+            self.client = UpstageEmbeddings(model=self.model)
+        for start in range(0, len(missing), EMBED_BATCH):
+            batch = missing[start:start + EMBED_BATCH]
+            began = time.perf_counter()
+            vectors = self.client.embed_documents([t for _, t in batch])
+            self.stats["api_ms"] += (time.perf_counter() - began) * 1000
+            self.stats["api_calls"] += 1
+            self.stats["tokens"] += sum(estimate_tokens(t) for _, t in batch)
+            with self.conn:
+                for (key, _), vec in zip(batch, vectors):
+                    arr = np.asarray(vec, dtype=np.float32)
+                    found[key] = arr
+                    self.conn.execute("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", (key, arr.tobytes()))
+        return np.stack([found[k] for k in keys])
+
+
+def rechunk(corpus: Corpus, size: int, overlap: int, cache: EmbeddingCache) -> Corpus:
+    """
+    스냅샷 청크를 페이지 단위로 다시 이어 붙인 뒤 (청크 겹침 제거) size/overlap으로 재분할·재임베딩.
+    페이지 메타데이터는 유지되므로 페이지/문서 단위 라벨을 그대로 쓸 수 있다.
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    pages = {}
+    for record in sorted(corpus.records, key=lambda r: (str(r.get("source_file")), r.get("page") or 0,
+                                                         r.get("chunk") or 0)):
+        key = page_key(record)
+        if key not in pages:
+            pages[key] = {"meta": {k: v for k, v in record.items() if k not in ("id", "text", "chunk")},
+                          "text": record["text"]}
+        else:
+            pages[key]["text"] = _join_overlapping(pages[key]["text"], record["text"])
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=overlap)
+    records = []
+    for key, page in pages.items():
+        for idx, chunk in enumerate(splitter.split_text(page["text"])):
+            records.append({**page["meta"], "id": f"{key}#{idx}", "chunk": idx, "text": chunk})
+    vectors = cache.embed([r["text"] for r in records])
+    return Corpus(records, vectors)
+
+
+def _join_overlapping(left: str, right: str, max_overlap: int = 1000) -> str:
+    """left 끝과 right 앞이 겹치는 가장 긴 구간을 한 번만 남기고 연결"""
+    for n in range(min(len(left), len(right), max_overlap), 0, -1):
+        if left.endswith(right[:n]):
+            return left + right[n:]
+    return left + "\n" + right
+
+
+# ──────────────────────────────────────────────────────────────
+# 3) 평가
+# ──────────────────────────────────────────────────────────────
+def load_labels(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def is_relevant(record: dict, relevant: set) -> bool:
+    return page_key(record) in relevant or record.get("source_file") in relevant
+
+
+def score_ranking(records: list, relevant: set) -> dict:
+    """recall (정답 항목 중 찾은 비율), hit (하나라도 찾았는지), reciprocal rank"""
+    found, rr = set(), 0.0
+    for rank, record in enumerate(records, 1):
+        for key in (page_key(record), record.get("source_file")):
+            if key in relevant:
+                found.add(key)
+                rr = rr or 1 / rank
+    return {"recall": len(found) / len(relevant) if relevant else 0.0,
+            "hit": 1.0 if found else 0.0, "mrr": rr}
+
+
+class Evaluator:
+    def __init__(self, corpus: Corpus, cache: EmbeddingCache):
+        from langchain_community.cross_encoders import HuggingFaceCrossEncoder
+
+        self.corpus  = corpus
+        self.cache   = cache
+        self.cross_encoder = HuggingFaceCrossEncoder(model_name=config.RERANK_MODEL)
+
+    def rerank(self, query: str, hits: list) -> tuple:
+        """(재정렬된 record 목록, 소요 ms)"""
+        if not hits:
+            return [], 0.0
+        began = time.perf_counter()
+        scores = self.cross_encoder.score([(query, r["text"]) for r, _ in hits])
+        elapsed = (time.perf_counter() - began) * 1000
+        order = np.argsort(-np.asarray(scores))
+        return [hits[i][0] for i in order], elapsed
+
+    def context_tokens(self, records: list, top_n: int) -> int:
+        from langchain_core.documents import Document
+        docs = [Document(page_content=r["text"], metadata={}) for r in records]
+        return estimate_tokens(format_docs(docs, max_docs=top_n))
+
+    def run(self, labels: list, ks: list, top_ns: list) -> dict:
+        """
+        설정별 결과 {"k=10 rerank top_n=3": {...}}.
+        같은 k는 검색/rerank를 한 번만 하고 top_n 별로 잘라서 평가 (rerank 비용은 top_n과 무관)
+        """
+        queries = [item["query"] for item in labels]
+        query_vectors = self.cache.embed(queries)
+        rows = {}
+
+        def add(name, metrics, latency):
+            row = rows.setdefault(name, {"metrics": [], "search_ms": [], "rerank_ms": [], "context_tokens": [],
+                                         "rerank_pairs": []})
+            row["metrics"].append(metrics)
+            for key, value in latency.items():
+                row[key].append(value)
+
+        for item, vector in zip(labels, query_vectors):
+            relevant = set(item.get("relevant") or [])
+            search_filter, explicit = resolve_filters(item["query"], item.get("filters"))
+            for k in sorted(set(ks) | set(top_ns)):
+                began = time.perf_counter()
+                hits = self.corpus.search(vector, k, search_filter)
+                # 서버(retrieve_documents)와 같은 규칙: 명시 필터는 결과가 적어도 전체 검색으로 넓히지 않음
+                if search_filter and not explicit and len(hits) < config.MIN_FILTERED_RESULTS:
+                    hits = self.corpus.search(vector, k)
+                search_ms = (time.perf_counter() - began) * 1000
+                vector_order = [r for r, _ in hits]
+
+                # rerank 없이 벡터 순서 상위 top_n (k == top_n 일 때만 의미 있음)
+                if k in top_ns:
+                    metrics = score_ranking(vector_order[:k], relevant)
+                    metrics["candidate_recall"] = metrics["recall"]
+                    add(f"k={k} vector", metrics,
+                        {"search_ms": search_ms, "rerank_ms": 0.0, "rerank_pairs": 0,
+                         "context_tokens": self.context_tokens(vector_order, k)})
+                if k not in ks:
+                    continue
+                reranked, rerank_ms = self.rerank(item["query"], hits)
+                for top_n in top_ns:
+                    if top_n > k:
+                        continue
+                    metrics = score_ranking(reranked[:top_n], relevant)
+                    metrics["candidate_recall"] = score_ranking(vector_order, relevant)["recall"]
+                    add(f"k={k} rerank top_n={top_n}", metrics,
+                        {"search_ms": search_ms, "rerank_ms": rerank_ms, "rerank_pairs": len(hits),
+                         "context_tokens": self.context_tokens(reranked, top_n)})
+
+        return {name: summarize_row(row) for name, row in rows.items()}
+
+
+def summarize_row(row: dict) -> dict:
+    def mean(values):
+        return round(statistics.fmean(values), 3) if values else 0.0
+
+    def p95(values):
+        return round(float(np.percentile(values, 95)), 1) if values else 0.0
+
+    metrics = row["metrics"]
+    summary = {key: mean([m[key] for m in metrics if key in m])
+               for key in ("recall", "hit", "mrr", "candidate_recall")}
+    summary.update({
+        "queries": len(metrics),
+        "search_ms": mean(row["search_ms"]),
+        "rerank_ms": mean(row["rerank_ms"]),
+        "rerank_ms_p95": p95(row["rerank_ms"]),
+        "rerank_pairs": mean(row["rerank_pairs"]),
+        "context_tokens": mean(row["context_tokens"]),
+    })
+    return summary
+
+
+def print_report(results: dict, min_recall: float, silver: bool = False):
+    """
+    silver=True : 라벨이 평가 대상과 같은 cross-encoder로 만들어졌으므로 rerank 설정 점수는
+                  자기 참조(과대평가)로 표시(*)
+    """
+    def tag(name):
+        return f"{name} *" if silver and "rerank" in name else name
+
+    print(f"\n {'config':<34}{'recall':>8}{'hit':>7}{'MRR':>7}{'cand.R':>8}"
+          f"{'search':>9}{'rerank':>9}{'p95':>8}{'ctx tok':>9}")
+    for name, r in sorted(results.items(), key=lambda kv: kv[1]["rerank_ms"] + kv[1]["search_ms"]):
+        print(f" {tag(name):<34}{r['recall']:>8.3f}{r['hit']:>7.3f}{r['mrr']:>7.3f}{r['candidate_recall']:>8.3f}"
+              f"{r['search_ms']:>9.1f}{r['rerank_ms']:>9.1f}{r['rerank_ms_p95']:>8.1f}{r['context_tokens']:>9.0f}")
+    if silver:
+        print("\n * silver 라벨은 같은 cross-encoder의 순위로 만든 것이라 rerank 설정 점수는 자기 참조입니다 "
+              "(정답 라벨로 다시 확인 필요).")
+    passing = [(name, r) for name, r in results.items() if r["recall"] >= min_recall]
+    if not passing:
+        print(f"\n recall ≥ {min_recall} 을 만족하는 설정이 없습니다.")
+        return None
+    # 지연(검색 + rerank)이 가장 작고, 같으면 컨텍스트 토큰이 적은 설정
+    best = min(passing, key=lambda nr: (round(nr[1]["search_ms"] + nr[1]["rerank_ms"]), nr[1]["context_tokens"]))
+    print(f"\n recall ≥ {min_recall} 중 가장 싼 설정: {tag(best[0])}")
+    return best[0]
+
+
+# ──────────────────────────────────────────────────────────────
+# 4) silver 라벨
+# ──────────────────────────────────────────────────────────────
+def read_logged_queries(path: str) -> list:
+    """질문 한 줄씩 적힌 파일 또는 rag-server 로그 (중복 제거, 등장 순서 유지)"""
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            match = LOG_QUESTION.search(line)
+            if match:
+                queries.append(match.group(1).strip())
+            elif "질문 받음" not in line and not line.startswith(("INFO", "WARNING", "ERROR")):
+                queries.append(line)
+    return list(dict.fromkeys(queries))
+
+
+def build_silver_labels(evaluator: Evaluator, queries: list, out_path: str) -> int:
+    """넓은 검색 + cross-encoder 상위 SILVER_TOP 페이지를 정답으로 기록"""
+    vectors = evaluator.cache.embed(queries)
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    count = 0
+    with open(out_path, "w", encoding="utf-8") as f:
+        for query, vector in zip(queries, vectors):
+            search_filter, explicit = resolve_filters(query)
+            hits = evaluator.corpus.search(vector, SILVER_K, search_filter)
+            if search_filter and not explicit and len(hits) < config.MIN_FILTERED_RESULTS:
+                hits = evaluator.corpus.search(vector, SILVER_K)
+            reranked, _ = evaluator.rerank(query, hits)
+            relevant = list(dict.fromkeys(page_key(r) for r in reranked))[:SILVER_TOP]
+            if relevant:
+                f.write(json.dumps({"query": query, "relevant": relevant, "silver": True},
+                                   ensure_ascii=False) + "\n")
+                count += 1
+    print(f" silver 라벨 {count}개 → {out_path}")
+    return count
+
+
+def parse_rechunk(value: str) -> tuple:
+    size, overlap = value.split(":")
+    return int(size), int(overlap)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="검색 설정 오프라인 평가")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_snap = sub.add_parser("snapshot", help="Pinecone 인덱스를 로컬로 복사")
+    p_snap.add_argument("--out", default=SNAPSHOT_DIR)
+
+    p_silver = sub.add_parser("silver", help="기록된 질문으로 silver 라벨 생성")
+    p_silver.add_argument("--queries", required=True)
+    p_silver.add_argument("--out", default="./eval/silver.jsonl")
+    p_silver.add_argument("--snapshot", default=SNAPSHOT_DIR)
+
+    p_run = sub.add_parser("run", help="설정 격자 평가")
+    p_run.add_argument("--labels", required=True)
+    p_run.add_argument("--snapshot", default=SNAPSHOT_DIR)
+    p_run.add_argument("--k", nargs="*", type=int, default=[5, 10, 20])
+    p_run.add_argument("--top-n", nargs="*", type=int, default=[3, 5])
+    p_run.add_argument("--rechunk", nargs="*", type=parse_rechunk, default=[],
+                       help="size:overlap – 스냅샷을 다시 청크/임베딩해 함께 비교 (예: 1000:100)")
+    p_run.add_argument("--min-recall", type=float, default=0.8)
+    p_run.add_argument("--report", default=REPORT_FILE)
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        snapshot_index(args.out)
+    else:
+        cache = EmbeddingCache()
+        corpus = Corpus.load(args.snapshot)
+        evaluator = Evaluator(corpus, cache)
+        if args.command == "silver":
+            build_silver_labels(evaluator, read_logged_queries(args.queries), args.out)
+        else:
+            labels = load_labels(args.labels)
+            silver = any(item.get("silver") for item in labels)
+            report = {"labels": args.labels, "queries": len(labels), "silver": silver, "results": {}}
+            results = evaluator.run(labels, args.k, args.top_n)
+            for size, overlap in args.rechunk:
+                print(f" 재청크 {size}:{overlap} ...")
+                evaluator.corpus = rechunk(corpus, size, overlap, cache)
+                for name, row in evaluator.run(labels, args.k, args.top_n).items():
+                    results[f"chunk={size}:{overlap} {name}"] = {**row, "chunks": len(evaluator.corpus.records)}
+                evaluator.corpus = corpus
+            report["results"] = results
+            report["recommended"] = print_report(results, args.min_recall, silver)
+            report["embedding_cache"] = cache.stats
+            os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f" 임베딩 캐시: {json.dumps(cache.stats)}")
+            print(f" 리포트 저장: {args.report}")
@@ -0,0 +1,147 @@
+"""
+http_pool.py
+────────────────────────────────────────────────────────────────
+업스트림 API(Upstage 채팅/임베딩)용 공유 httpx 연결 풀.
+• AsyncClient / Client 한 쌍을 ChatUpstage, UpstageEmbeddings 에 http_async_client / http_client 로 주입
+  → 요청마다 새 TCP/TLS 연결을 맺지 않고 keep-alive 연결을 재사용
+• h2 패키지가 설치되어 있으면 HTTP/2 (한 연결로 여러 스트림 다중화)
+• 연결 수 상한은 동시 처리 수(MAX_INFLIGHT, BATCH_CONCURRENCY)에 맞춤
+• 한동안 요청이 없으면 주기적으로 가벼운 요청을 보내 연결을 데워 둠 (첫 토큰 지연에서 핸드셰이크 제거)
+• httpcore trace 확장으로 새 연결 / TLS 핸드셰이크 / 재사용 횟수와 소요 시간 집계 → /health
+Pinecone 클라이언트는 자체 HTTP 스택(urllib3)을 쓰므로 이 풀을 공유할 수 없다
+(main.py 가 인덱스 객체 하나를 connection_pool_maxsize로 만들어 재사용).
+────────────────────────────────────────────────────────────────
+"""
+import time
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (HTTP/2 지원 여부 확인용)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class ConnectionStats:
+    """httpcore trace 이벤트로 연결 생성/재사용 집계 (동시에 맺는 연결의 소요 시간은 근사치)"""
+
+    def __init__(self):
+        self.started = {}
+        self.stats = {
+            "requests": 0,
+            "new_connections": 0,
+            "tls_handshakes": 0,
+            "connect_ms_total": 0.0,
+            "tls_ms_total": 0.0,
+            "prewarms": 0,
+            "http_versions": {},
+        }
+
+    def on_event(self, name: str, info: dict):
+        if name.endswith(".started"):
+            self.started[name[:-len(".started")]] = time.perf_counter()
+            if name.endswith("send_request_headers.started"):
+                self.stats["requests"] += 1
+                version = "HTTP/2" if name.startswith("http2") else "HTTP/1.1"
+                self.stats["http_versions"][version] = self.stats["http_versions"].get(version, 0) + 1
+            return
+        if not name.endswith(".complete"):
+            return
+        step = name[:-len(".complete")]
+        began = self.started.pop(step, None)
+        elapsed = (time.perf_counter() - began) * 1000 if began else 0.0
+        if step == "connection.connect_tcp":
+            self.stats["new_connections"] += 1
+            self.stats["connect_ms_total"] += elapsed
+        elif step == "connection.start_tls":
+            self.stats["tls_handshakes"] += 1
+            self.stats["tls_ms_total"] += elapsed
+
+    def snapshot(self) -> dict:
+        s = self.stats
+        reused = max(0, s["requests"] - s["new_connections"])
+        return {
+            "requests": s["requests"],
+            "new_connections": s["new_connections"],
+            "reused_connections": reused,
+            "reuse_ratio": round(reused / s["requests"], 3) if s["requests"] else 0.0,
+            "tls_handshakes": s["tls_handshakes"],
+            "avg_connect_ms": round(s["connect_ms_total"] / s["new_connections"], 1) if s["new_connections"] else 0.0,
+            "avg_tls_ms": round(s["tls_ms_total"] / s["tls_handshakes"], 1) if s["tls_handshakes"] else 0.0,
+            "prewarms": s["prewarms"],
+            "http_versions": dict(s["http_versions"]),
+        }
+
+
+class HttpPool:
+    def __init__(self, max_connections: int, max_keepalive: int, keepalive_expiry: float,
+                 timeout: float = 60.0, http2: bool = True):
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.stats = ConnectionStats()
+        self.last_used = time.monotonic()
+        limits = httpx.Limits(max_connections=max_connections,
+                              max_keepalive_connections=max_keepalive,
+                              keepalive_expiry=keepalive_expiry)
+        timeout = httpx.Timeout(timeout, connect=10.0)
+
+        async def trace_async(name, info):
+            self.stats.on_event(name, info)
+
+        def trace_sync(name, info):
+            self.stats.on_event(name, info)
+
+        # 모든 요청에 trace 확장을 붙여 연결 단계 이벤트를 받음
+        async def attach_async(request: httpx.Request):
+            self.last_used = time.monotonic()
+            request.extensions["trace"] = trace_async
+
+        def attach_sync(request: httpx.Request):
+            self.last_used = time.monotonic()
+            request.extensions["trace"] = trace_sync
+
+        self.async_client = httpx.AsyncClient(http2=self.http2, limits=limits, timeout=timeout,
+                                              event_hooks={"request": [attach_async]})
+        self.sync_client = httpx.Client(http2=self.http2, limits=limits, timeout=timeout,
+                                        event_hooks={"request": [attach_sync]})
+        self._prewarm_task: Optional[asyncio.Task] = None
+
+    # ────── 사전 연결 ─────────────────────────────────────────
+    async def prewarm(self, urls):
+        """각 업스트림에 가벼운 요청을 보내 연결(TCP+TLS)을 풀에 만들어 둠. 응답 코드는 상관없음"""
+        for url in urls:
+            try:
+                await self.async_client.get(url)
+                self.stats.stats["prewarms"] += 1
+            except httpx.HTTPError as e:
+                logger.warning(f"연결 사전 준비 실패 ({url}): {e}")
+
+    def start_prewarm(self, urls, interval: float):
+        """interval초 이상 요청이 없을 때마다 prewarm (keepalive_expiry보다 짧게 잡아야 연결이 유지됨)"""
+        async def loop():
+            await self.prewarm(urls)
+            while True:
+                await asyncio.sleep(interval)
+                if time.monotonic() - self.last_used >= interval:
+                    await self.prewarm(urls)
+
+        self._prewarm_task = asyncio.get_running_loop().create_task(loop())
+
+    async def close(self):
+        if self._prewarm_task:
+            self._prewarm_task.cancel()
+            try:
+                await self._prewarm_task
+            except asyncio.CancelledError:
+                pass
+        await self.async_client.aclose()
+        self.sync_client.close()
+
+    def snapshot(self) -> dict:
+        return {**self.stats.snapshot(), "http2": self.http2,
+                "idle_seconds": round(time.monotonic() - self.last_used, 1)}
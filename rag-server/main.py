@@ -1,9 +1,14 @@
 import asyncio
+import hmac
 import json
+import os
+import re
+import time
 from typing import List, AsyncGenerator, Dict, Optional
-from contextlib import asynccontextmanager
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
-from fastapi.responses import HTMLResponse
+from contextlib import asynccontextmanager, aclosing
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, Header, Depends
+from fastapi.responses import HTMLResponse, StreamingResponse, FileResponse
+from pydantic import BaseModel
 from langchain_pinecone import PineconeVectorStore
 from langchain_upstage import UpstageEmbeddings, ChatUpstage
 from langchain.chains import RetrievalQA
@@ -16,6 +21,11 @@ from langchain.retrievers.document_compressors import CrossEncoderReranker
 from langchain_community.cross_encoders import HuggingFaceCrossEncoder
 import uvicorn
 from config import config
+from admission import AdmissionController, AdmissionRejected
+from profiling import LoopLagMonitor, SamplingProfiler
+from http_pool import HttpPool
+from retrieval import resolve_filters, format_docs
+from pinecone import Pinecone
 import logging
 
 # 로깅 설정
@@ -65,12 +75,153 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+class StageTimer:
+    """요청 수신 시점부터 각 단계 완료까지의 경과 시간(ms) 기록"""
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks: Dict[str, float] = {}
+
+    def mark(self, stage: str):
+        self.marks[stage] = round((time.perf_counter() - self.start) * 1000, 1)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+class Deadline:
+    """
+    요청 마감 시각 (수신 → 첫 답변 토큰). LLMService 단계들이 남은 예산을 보고
+    분류 생략 / 검색 개수 축소 / rerank 축소·생략 / 컨텍스트 축소를 결정하며,
+    적용한 축소 단계는 degradations에 쌓여 stream_end로 전달된다.
+    """
+    def __init__(self, budget_ms: Optional[float] = None):
+        try:
+            self.budget_ms = float(budget_ms) if budget_ms else float(config.REQUEST_DEADLINE_MS)
+        except (TypeError, ValueError):
+            self.budget_ms = float(config.REQUEST_DEADLINE_MS)
+        self.expires = time.perf_counter() + self.budget_ms / 1000
+        self.degradations: List[str] = []
+
+    def remaining_ms(self) -> float:
+        return (self.expires - time.perf_counter()) * 1000
+
+    def allows(self, min_budget_ms: float) -> bool:
+        return self.remaining_ms() >= min_budget_ms
+
+    def degrade(self, name: str):
+        if name not in self.degradations:
+            self.degradations.append(name)
+            logger.info(f"마감 임박 – {name} (남은 예산 {self.remaining_ms():.0f}ms)")
+
+class ClientDisconnected(Exception):
+    """WebSocket 전송 실패 – 받을 클라이언트가 없으므로 답변 생성을 중단해야 함"""
+
+class RequestTracker:
+    """
+    진행 중인 답변 생성 작업을 (websocket, clientId) 단위의 asyncio Task로 추적.
+    같은 clientId의 새 질문 / cancel 메시지 / 연결 끊김 시 Task를 취소해
+    검색·rerank·LLM 스트림을 즉시 중단하고, 아낀 업스트림 토큰을 집계한다.
+    """
+    def __init__(self):
+        self.tasks: Dict[tuple, asyncio.Task] = {}
+        self.reasons: Dict[asyncio.Task, str] = {}
+        self.avg_answer_tokens: Optional[float] = None  # 완료된 답변 토큰 수 지수이동평균
+        self.stats = {
+            "started": 0,
+            "completed": 0,
+            "cancelled": {},                    # 사유별 취소 건수
+            "tokens_streamed_before_cancel": 0,
+            "tokens_saved_estimate": 0,
+        }
+
+    def start(self, key: tuple, coro) -> asyncio.Task:
+        """새 작업 등록. 같은 키로 진행 중인 작업은 superseded로 취소"""
+        self.cancel(key, "superseded")
+        task = asyncio.create_task(coro)
+        self.tasks[key] = task
+        self.stats["started"] += 1
+        task.add_done_callback(lambda t: self._forget(key, t))
+        return task
+
+    def cancel(self, key: tuple, reason: str) -> bool:
+        task = self.tasks.get(key)
+        if task is None or task.done():
+            return False
+        self.reasons[task] = reason
+        task.cancel()
+        self.stats["cancelled"][reason] = self.stats["cancelled"].get(reason, 0) + 1
+        return True
+
+    def cancel_all(self, websocket_id: int, reason: str = "disconnected") -> int:
+        keys = [key for key in self.tasks if key[0] == websocket_id]
+        return sum(self.cancel(key, reason) for key in keys)
+
+    def record_completed(self, tokens: int):
+        self.stats["completed"] += 1
+        if self.avg_answer_tokens is None:
+            self.avg_answer_tokens = float(tokens)
+        else:
+            self.avg_answer_tokens = 0.9 * self.avg_answer_tokens + 0.1 * tokens
+
+    def record_aborted(self, tokens: int, reason: Optional[str] = None):
+        """
+        취소/끊김으로 중단된 답변 기록. 아낀 토큰 = 평균 답변 길이 - 이미 받은 토큰
+        (스트림 청크 1개 ≈ 토큰 1개로 계산)
+        """
+        if reason:
+            self.stats["cancelled"][reason] = self.stats["cancelled"].get(reason, 0) + 1
+        expected = self.avg_answer_tokens or config.EXPECTED_ANSWER_TOKENS
+        self.stats["tokens_streamed_before_cancel"] += tokens
+        self.stats["tokens_saved_estimate"] += max(0, int(expected - tokens))
+
+    def reason_of(self, task: Optional[asyncio.Task]) -> Optional[str]:
+        return self.reasons.get(task)
+
+    def _forget(self, key: tuple, task: asyncio.Task):
+        self.reasons.pop(task, None)
+        if self.tasks.get(key) is task:
+            del self.tasks[key]
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "in_flight": len(self.tasks),
+                "avg_answer_tokens": round(self.avg_answer_tokens or 0, 1)}
+
+request_tracker = RequestTracker()
+
+loop_monitor = LoopLagMonitor(config.LOOP_LAG_THRESHOLD_MS, config.LOOP_LAG_INTERVAL)
+
+def is_admin_token(candidate) -> bool:
+    """config ADMIN_TOKEN과 일치하는지 (토큰 미설정 시 항상 False)"""
+    token = config.get_admin_token()
+    if not token or not isinstance(candidate, str):
+        return False
+    # 타이밍 차이로 토큰을 한 글자씩 맞춰 볼 수 없도록 상수 시간 비교
+    return hmac.compare_digest(candidate.encode(), token.encode())
+
+def save_profile(profiler: SamplingProfiler, prefix: str) -> str:
+    """프로파일러를 멈추고 PROFILE_DIR에 folded stack 저장. 파일 이름 반환"""
+    profiler.stop()
+    prefix = re.sub(r"[^\w-]", "_", prefix)
+    name = f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}.folded"
+    profiler.save(config.PROFILE_DIR, name)
+    logger.info(f"프로파일 저장: {name} (샘플 {profiler.samples}개)")
+    return name
+
+admission = AdmissionController(
+    max_inflight=config.MAX_INFLIGHT,
+    queue_size=config.ADMISSION_QUEUE_SIZE,
+    client_rate=config.CLIENT_RATE,
+    client_burst=config.CLIENT_BURST,
+)
+
 class LLMService:
     def __init__(self):
         self.client = None
         self.vectorstore = None
         self.embeddings = None
         self.base_retriever = None
+        self.cross_encoder = None
+        self.http_pool = None
+        self.reranker_compressor = None
         self.reranker_retriever = None
         self.rag_chain = None
         self.advanced_rag_chain = None
@@ -85,18 +236,38 @@ class LLMService:
             # 환경 변수 설정
             config.setup_environment()
             
+            # 업스트림 호출이 함께 쓰는 keep-alive 연결 풀
+            self.http_pool = HttpPool(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive=config.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+                timeout=config.HTTP_TIMEOUT,
+            )
+            
             # Upstage 클라이언트 설정
             self.client = ChatUpstage(
                 api_key=config.get_upstage_api_key(),
                 model=config.UPSTAGE_MODEL,
                 streaming=True,
-                temperature=0
+                temperature=0,
+                http_client=self.http_pool.sync_client,
+                http_async_client=self.http_pool.async_client
             )
             
             # 임베딩 및 벡터스토어 설정
-            self.embeddings = UpstageEmbeddings(model=config.EMBEDDING_MODEL)
+            self.embeddings = UpstageEmbeddings(
+                model=config.EMBEDDING_MODEL,
+                http_client=self.http_pool.sync_client,
+                http_async_client=self.http_pool.async_client
+            )
+            # Pinecone은 자체 HTTP 스택(urllib3)을 쓰므로 인덱스 객체 하나를 만들어 연결 풀을 재사용.
+            # 검색은 이 동기 인덱스를 스레드에서 호출 (async 검색 API는 질의마다 새 async 클라이언트를 만듦)
+            pinecone_index = Pinecone(api_key=config.get_pinecone_api_key()).Index(
+                config.PINECONE_INDEX_NAME,
+                connection_pool_maxsize=config.PINECONE_CONNECTION_POOL_MAXSIZE,
+            )
             self.vectorstore = PineconeVectorStore(
-                index_name=config.PINECONE_INDEX_NAME,
+                index=pinecone_index,
                 embedding=self.embeddings
             )
             
@@ -124,9 +295,9 @@ class LLMService:
             if self.vectorstore:
                 # Pinecone 연결 정리 (필요한 경우)
                 pass
-            if self.client:
-                # Upstage 클라이언트 정리 (필요한 경우)
-                pass
+            if self.http_pool:
+                # 공유 연결 풀 정리 (Upstage 채팅/임베딩)
+                await self.http_pool.close()
             logger.info("LLMService 리소스 정리 완료")
         except Exception as e:
             logger.error(f"리소스 정리 중 오류: {e}")
@@ -135,12 +306,14 @@ class LLMService:
         """Cross-encoder reranker 설정"""
         try:
             # Cross-encoder 모델 초기화
-            cross_encoder = HuggingFaceCrossEncoder(
-                model_name="cross-encoder/ms-marco-MiniLM-L-6-v2"
+            self.cross_encoder = HuggingFaceCrossEncoder(
+                model_name=config.RERANK_MODEL
             )
             
             # Reranker 컴프레서 설정
-            self.reranker_compressor = CrossEncoderReranker(model=cross_encoder)
+            self.reranker_compressor = CrossEncoderReranker(
+                model=self.cross_encoder, top_n=config.RERANK_TOP_N
+            )
             
             # Contextual Compression Retriever로 reranker 적용
             self.reranker_retriever = ContextualCompressionRetriever(
@@ -211,22 +384,12 @@ Answer:""",
         
     def _setup_chains(self):
         """RAG 체인 설정 (Reranker 포함)"""
-        def format_docs(docs):
-            """문서들을 컨텍스트 문자열로 포맷팅"""
-            if not docs:
-                return "관련 문서를 찾을 수 없습니다."
-            
-            top_docs = docs[:5]
-            formatted_docs = []
-            for i, doc in enumerate(top_docs, 1):
-                # reranker score가 있다면 표시
-                score_info = ""
-                if hasattr(doc, 'metadata') and 'relevance_score' in doc.metadata:
-                    score_info = f" (관련도: {doc.metadata['relevance_score']:.3f})"
-                
-                formatted_docs.append(f"[문서 {i}{score_info}]\n{doc.page_content}")
-            
-            return "\n\n".join(formatted_docs)
+        # 검색/rerank를 직접 수행한 뒤 context를 넘겨 답변만 생성하는 체인 (스트리밍 기본 경로)
+        self.answer_chain = (
+            self.rag_prompt
+            | self.client
+            | StrOutputParser()
+        )
 
         # 기본 RAG 체인
         self.rag_chain = (
@@ -256,6 +419,211 @@ Answer:""",
             )
         )
             
+    async def search_documents(self, question: str, search_filter: Optional[dict] = None,
+                               k: Optional[int] = None, vector: Optional[List[float]] = None) -> List:
+        """
+        벡터 검색 (reranking 전). metadata['vector_score']에 유사도 기록.
+        임베딩은 공유 httpx 풀로, Pinecone 질의는 공유 인덱스(urllib3 풀)로 스레드에서 실행.
+        vector를 주면 임베딩을 다시 하지 않는다 (필터 재검색).
+        """
+        if vector is None:
+            vector = await self.embeddings.aembed_query(question)
+        results = await asyncio.to_thread(
+            self.vectorstore.similarity_search_by_vector_with_score,
+            vector, k=k or config.RETRIEVAL_K, filter=search_filter
+        )
+        docs = []
+        for doc, score in results:
+            doc.metadata["vector_score"] = float(score)
+            docs.append(doc)
+        return docs
+
+    async def rerank_documents(self, question: str, docs: List, top_n: Optional[int] = None) -> List:
+        """Cross-encoder 점수로 재정렬. metadata['relevance_score']에 점수 기록"""
+        top_n = top_n or config.RERANK_TOP_N
+        if self.cross_encoder is None or not docs:
+            return docs[:top_n]
+        pairs = [(question, doc.page_content) for doc in docs]
+        # CPU 연산이므로 이벤트 루프를 막지 않도록 스레드에서 실행
+        scores = await asyncio.to_thread(self.cross_encoder.score, pairs)
+        for doc, score in zip(docs, scores):
+            doc.metadata["relevance_score"] = float(score)
+        return sorted(docs, key=lambda d: d.metadata["relevance_score"], reverse=True)[:top_n]
+
+    async def retrieve_documents(self, question: str, search_filter: Optional[dict] = None,
+                                 strict: bool = False, timer: Optional[StageTimer] = None,
+                                 deadline: Optional[Deadline] = None) -> List:
+        """
+        필터 검색 후 reranking. 추론한 필터(strict=False)로 찾은 문서가
+        MIN_FILTERED_RESULTS보다 적으면 (태그가 잘못 붙은 문서 등) 전체 인덱스로 재검색.
+        deadline이 있으면 남은 예산에 따라 검색 개수 / 재검색 / rerank 후보를 줄이고,
+        임베딩+검색이 남은 예산(최소 RETRIEVAL_MIN_TIMEOUT_MS)을 넘기면 문서 없이 답변한다.
+        """
+        k = config.RETRIEVAL_K
+        if deadline and not deadline.allows(config.FULL_K_MIN_BUDGET_MS):
+            k = config.DEGRADED_RETRIEVAL_K
+            deadline.degrade("reduced_k")
+
+        async def embed_and_search():
+            vector = await self.embeddings.aembed_query(question)
+            return vector, await self.search_documents(question, search_filter, k, vector)
+
+        if deadline is None:
+            vector, docs = await embed_and_search()
+        else:
+            timeout = max(deadline.remaining_ms(), config.RETRIEVAL_MIN_TIMEOUT_MS) / 1000
+            try:
+                vector, docs = await asyncio.wait_for(embed_and_search(), timeout=timeout)
+            except asyncio.TimeoutError:
+                # 스레드의 Pinecone 질의는 끝까지 돌지만 결과를 기다리지 않음
+                deadline.degrade("retrieval_timeout")
+                if timer:
+                    timer.mark("retrieved")
+                return []
+        if search_filter and not strict and len(docs) < config.MIN_FILTERED_RESULTS:
+            if deadline and not deadline.allows(config.FALLBACK_MIN_BUDGET_MS):
+                deadline.degrade("filter_fallback_skipped")
+            else:
+                logger.info(f"필터 {search_filter} 결과 {len(docs)}건 → 전체 인덱스 검색")
+                docs = await self.search_documents(question, k=k, vector=vector)
+        if timer:
+            timer.mark("retrieved")
+        docs = await self._rerank_within_deadline(question, docs, deadline)
+        if timer:
+            timer.mark("reranked")
+        return docs
+
+    async def _rerank_within_deadline(self, question: str, docs: List,
+                                      deadline: Optional[Deadline] = None) -> List:
+        """남은 예산이 부족하면 rerank 후보를 줄이거나 벡터 검색 순서(base_retriever 순서)를 그대로 사용"""
+        if deadline is None:
+            return await self.rerank_documents(question, docs)
+        if not deadline.allows(config.RERANK_MIN_BUDGET_MS):
+            deadline.degrade("rerank_skipped")
+            return docs[:config.RERANK_TOP_N]
+        if not deadline.allows(config.FULL_RERANK_MIN_BUDGET_MS):
+            docs = docs[:config.DEGRADED_RERANK_CANDIDATES]
+            deadline.degrade("rerank_reduced")
+        timeout = (deadline.remaining_ms() - config.RERANK_RESERVE_MS) / 1000
+        try:
+            return await asyncio.wait_for(self.rerank_documents(question, docs), timeout=max(timeout, 0))
+        except asyncio.TimeoutError:
+            # 스레드의 cross-encoder 연산은 끝까지 돌지만 결과를 기다리지 않음
+            deadline.degrade("rerank_timeout")
+            return docs[:config.RERANK_TOP_N]
+
+    @staticmethod
+    def describe_sources(docs: List) -> List[dict]:
+        """프론트엔드에 보낼 근거 문서 요약 (title / sourceUrl 은 URL·제목을 기록한 뒤 인덱싱된 청크에만 있음)"""
+        sources = []
+        for rank, doc in enumerate(docs, 1):
+            meta = doc.metadata
+            sources.append({
+                "rank": rank,
+                "sourceFile": meta.get("source_file"),
+                "title": meta.get("title"),
+                "sourceUrl": meta.get("source_url"),
+                "page": meta.get("page"),
+                "chunk": meta.get("chunk"),
+                "relevanceScore": meta.get("relevance_score"),
+                "vectorScore": meta.get("vector_score"),
+                "diseases": meta.get("diseases", []),
+                "preview": doc.page_content[:200],
+            })
+        return sources
+
+    # ────── 배치 질의 ──────────────────────────────────────────
+    async def search_batch(self, questions: List[str], search_filters: List[Optional[dict]],
+                           strict: Optional[List[bool]] = None, k: Optional[int] = None) -> List[List]:
+        """
+        모든 질문을 임베딩 호출 한 번으로 벡터화한 뒤 Pinecone 검색을 동시에 실행.
+        추론 필터(strict=False) 결과가 MIN_FILTERED_RESULTS보다 적으면 해당 질문만 전체 인덱스로 재검색
+        (retrieve_documents 와 같은 규칙 – 명시 필터는 넓히지 않음)
+        """
+        k = k or config.RETRIEVAL_K
+        strict = strict or [False] * len(questions)
+        vectors = await self.embeddings.aembed_documents(questions)
+
+        async def search(question, vector, search_filter, strict_filter):
+            docs = await self.search_documents(question, search_filter, k, vector)
+            if search_filter and not strict_filter and len(docs) < config.MIN_FILTERED_RESULTS:
+                docs = await self.search_documents(question, k=k, vector=vector)
+            return docs
+
+        return await asyncio.gather(*(
+            search(q, v, f, st) for q, v, f, st in zip(questions, vectors, search_filters, strict)
+        ))
+
+    async def rerank_batch(self, questions: List[str], doc_lists: List[List],
+                           top_n: Optional[int] = None) -> List[List]:
+        """모든 (질문, 문단) 쌍을 cross-encoder 한 번의 배치로 점수화한 뒤 질문별로 재정렬"""
+        top_n = top_n or config.RERANK_TOP_N
+        pairs = [(q, doc.page_content) for q, docs in zip(questions, doc_lists) for doc in docs]
+        if self.cross_encoder is None or not pairs:
+            return [docs[:top_n] for docs in doc_lists]
+        scores = iter(await asyncio.to_thread(self.cross_encoder.score, pairs))
+        reranked = []
+        for docs in doc_lists:
+            for doc in docs:
+                doc.metadata["relevance_score"] = float(next(scores))
+            reranked.append(sorted(docs, key=lambda d: d.metadata["relevance_score"], reverse=True)[:top_n])
+        return reranked
+
+    async def answer_batch(self, items: List[dict], concurrency: Optional[int] = None) -> AsyncGenerator[dict, None]:
+        """
+        배치 질의: 임베딩 1회 → 동시 검색 → rerank 1회 → concurrency개씩 답변 생성
+        (기본 BATCH_CONCURRENCY, 호출 측이 확보한 입장 슬롯 수를 넘기면 안 됨).
+        items: [{"id", "question", "filters"}] – 답변이 끝나는 순서대로 결과 dict를 yield하고
+        마지막에 단계별 시간이 담긴 summary를 yield한다.
+        """
+        if not self._initialized:
+            await self.initialize()
+        timer = StageTimer()
+        questions = [item["question"] for item in items]
+        resolved = [resolve_filters(item["question"], item.get("filters")) for item in items]
+        search_filters = [search_filter for search_filter, _ in resolved]
+        strict = [explicit for _, explicit in resolved]
+
+        doc_lists = await self.search_batch(questions, search_filters, strict)
+        timer.mark("retrieved")
+        doc_lists = await self.rerank_batch(questions, doc_lists)
+        timer.mark("reranked")
+
+        semaphore = asyncio.Semaphore(concurrency or config.BATCH_CONCURRENCY)
+
+        async def generate(item, docs):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    answer = await self.answer_chain.ainvoke(
+                        {"input": item["question"], "context": format_docs(docs)}
+                    )
+                    error = None
+                except Exception as e:
+                    logger.error(f"배치 답변 생성 오류 ({item['id']}): {e}")
+                    answer, error = None, str(e)
+            return {
+                "type": "result",
+                "id": item["id"],
+                "question": item["question"],
+                "answer": answer,
+                "error": error,
+                "sources": self.describe_sources(docs),
+                "generationMs": round((time.perf_counter() - started) * 1000, 1),
+            }
+
+        tasks = [asyncio.create_task(generate(item, docs)) for item, docs in zip(items, doc_lists)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # 클라이언트가 응답 도중 끊으면 남은 생성 작업 취소
+            for task in tasks:
+                task.cancel()
+        timer.mark("completed")
+        yield {"type": "summary", "count": len(items), "timings": timer.marks,
+               "perQuestionMs": round(timer.elapsed_ms() / len(items), 1)}
+
     async def should_use_rag(self, question: str) -> bool:
         """RAG 사용 여부 판단"""
         try:
@@ -273,55 +641,130 @@ Answer:""",
             logger.error(f"분류 실패: {e}")
             return False
 
-    async def get_streaming_answer(self, question: str, websocket: WebSocket, client_id: str = None) -> str:
-        """WebSocket을 통한 스트리밍 답변 생성"""
+    async def get_streaming_answer(self, question: str, websocket: WebSocket, client_id: str = None,
+                                   filters: Optional[dict] = None, deadline: Optional[Deadline] = None,
+                                   profile: bool = False, timer: Optional[StageTimer] = None) -> str:
+        """
+        WebSocket을 통한 스트리밍 답변 생성
+        RAG 답변은 reranking이 끝나는 즉시 sources 메시지를 먼저 보내고 답변 토큰을 스트리밍.
+        sources / stream_end 에는 단계별 경과 시간(timings, ms)이 포함된다.
+        timer는 요청 수신 시점에 만들어 넘겨야 대기열 대기 시간까지 timings에 잡힌다.
+        request_tracker가 Task를 취소하면 어느 단계에서든 CancelledError로 즉시 중단된다.
+        deadline의 남은 예산에 따라 단계를 축소하고, 적용한 축소 목록을 stream_end에 담는다.
+        profile=True면 (질문 메시지에 관리자 토큰이 있을 때만) 이 요청이 처리되는 동안
+        샘플링 프로파일러를 돌리고 파일 이름을 stream_end에 담는다.
+        요청의 코루틴은 루프 스레드를, rerank는 공용 스레드 풀을 다른 요청과 같이 쓰므로 스레드로는
+        이 요청만 골라낼 수 없다 → 프로파일은 그 시간 동안의 프로세스 전체 샘플 (profileScope: process).
+        """
+        timer = timer or StageTimer()
+        deadline = deadline or Deadline()
+        tokens = 0
+        profiler = None
+        if profile:
+            profiler = SamplingProfiler(config.PROFILE_INTERVAL)
+            profiler.start(config.PROFILE_MAX_SECONDS)
         try:
             if not self._initialized:
                 await self.initialize()
                 
-            # RAG 필요성 판단
-            needs_rag = await self.should_use_rag(question)
+            # 메타데이터 필터 결정 (명시 필터가 있으면 문헌 검색 질문으로 간주)
+            search_filter, explicit_filter = resolve_filters(question, filters)
+            
+            # RAG 필요성 판단 (예산이 부족하면 LLM 분류를 생략하고 문헌 검색으로 간주)
+            if explicit_filter:
+                needs_rag = True
+            elif not deadline.allows(config.CLASSIFY_MIN_BUDGET_MS):
+                deadline.degrade("classifier_skipped")
+                needs_rag = True
+            else:
+                # 분류 호출 자체가 늦어도 이후 단계 예산(CLASSIFY_MIN_BUDGET_MS)은 남겨 둠
+                timeout = (deadline.remaining_ms() - config.CLASSIFY_MIN_BUDGET_MS) / 1000
+                try:
+                    needs_rag = await asyncio.wait_for(self.should_use_rag(question), timeout=timeout)
+                except asyncio.TimeoutError:
+                    deadline.degrade("classifier_timeout")
+                    needs_rag = True
+            timer.mark("classified")
             
             if needs_rag:
                 # RAG를 사용한 답변
                 await self._send_websocket_message(websocket, client_id, "의료 문헌을 검색하여 답변드리겠습니다...\n\n", "token")
                 
-                full_answer = ""
-                async for chunk in self.stream_rag_response(question, use_advanced_chain=False):
-                    if chunk:
-                        await self._send_websocket_message(websocket, client_id, chunk, "token")
-                        full_answer += chunk
+                async def send_sources(docs):
+                    await self._send_websocket_message(
+                        websocket, client_id, self.describe_sources(docs), "sources",
+                        {"timings": dict(timer.marks)}
+                    )
                 
-                # 스트리밍 완료 신호
-                await self._send_websocket_message(websocket, client_id, full_answer, "stream_end")
-                return full_answer
+                stream = self.stream_rag_response(
+                    question, search_filter=search_filter, strict_filter=explicit_filter,
+                    on_sources=send_sources, timer=timer, deadline=deadline
+                )
             else:
                 # 일반 답변
                 await self._send_websocket_message(websocket, client_id, "답변을 생성하겠습니다...\n\n", "token")
-                
-                full_answer = ""
-                async for chunk in self.stream_response(question):
+                stream = self.stream_response(question)
+            
+            full_answer = ""
+            # 취소/전송 실패로 루프를 빠져나가면 aclosing이 즉시 스트림을 닫아 업스트림 연결을 정리
+            async with aclosing(stream):
+                async for chunk in stream:
                     if chunk:
+                        if not full_answer:
+                            timer.mark("first_token")
+                        tokens += 1
                         await self._send_websocket_message(websocket, client_id, chunk, "token")
                         full_answer += chunk
-                
-                # 스트리밍 완료 신호
-                await self._send_websocket_message(websocket, client_id, full_answer, "stream_end")
-                return full_answer
-                
+            timer.mark("completed")
+            request_tracker.record_completed(tokens)
+            
+            # 스트리밍 완료 신호
+            extra = {"rag": needs_rag, "timings": timer.marks,
+                     "deadlineMs": deadline.budget_ms, "degradations": deadline.degradations}
+            if profiler:
+                # 스레드 join + 파일 쓰기는 루프 밖에서
+                extra["profile"] = await asyncio.to_thread(
+                    save_profile, profiler, f"request-{client_id or 'anonymous'}"
+                )
+                extra["profileScope"] = "process"
+            await self._send_websocket_message(websocket, client_id, full_answer, "stream_end", extra)
+            return full_answer
+        
+        except asyncio.CancelledError:
+            # 새 질문 / cancel 메시지 / 연결 끊김 – 업스트림 스트림은 aclosing 블록을 나가며 닫힘
+            reason = request_tracker.reason_of(asyncio.current_task())
+            request_tracker.record_aborted(tokens)
+            logger.info(f"답변 생성 취소 ({reason}) - 클라이언트: {client_id}, 받은 토큰 {tokens}개")
+            raise
+        except ClientDisconnected:
+            request_tracker.record_aborted(tokens, "send_failed")
+            logger.info(f"전송 실패로 답변 생성 중단 - 클라이언트: {client_id}, 받은 토큰 {tokens}개")
+            return ""
         except Exception as e:
             error_msg = f"오류가 발생했습니다: {str(e)}"
             logger.error(f"스트리밍 답변 생성 중 오류: {e}")
-            await self._send_websocket_message(websocket, client_id, error_msg, "error")
+            try:
+                await self._send_websocket_message(websocket, client_id, error_msg, "error")
+            except ClientDisconnected:
+                pass
             return error_msg
+        finally:
+            if profiler and profiler.running:
+                profiler.stop()
 
-    async def _send_websocket_message(self, websocket: WebSocket, client_id: str, content: str, msg_type: str):
-        """WebSocket 메시지 전송 헬퍼 함수"""
+    async def _send_websocket_message(self, websocket: WebSocket, client_id: str, content, msg_type: str,
+                                      extra: Optional[dict] = None):
+        """
+        WebSocket 메시지 전송 헬퍼 함수 (extra 필드는 메시지 최상위에 병합).
+        전송에 실패하면 ClientDisconnected를 던져 호출 측이 업스트림 스트림을 멈추게 한다.
+        """
         try:
             response = {
                 "type": msg_type,
                 "content": content
             }
+            if extra:
+                response.update(extra)
             
             if client_id:
                 response["clientId"] = client_id
@@ -331,37 +774,56 @@ Answer:""",
             logger.error(f"WebSocket 메시지 전송 오류: {e}")
             # 연결이 끊어진 경우 manager에서 제거
             manager.disconnect(websocket, client_id)
+            raise ClientDisconnected(str(e)) from e
 
     async def stream_response(self, question: str) -> AsyncGenerator[str, None]:
         """일반적인 질문에 대한 스트리밍 응답"""
         try:
             # 단순히 HumanMessage 하나만 생성
             message = HumanMessage(content=question)
-            async for chunk in self.client.astream([message]):
-                if chunk.content:
-                    yield chunk.content
+            async with aclosing(self.client.astream([message])) as upstream:
+                async for chunk in upstream:
+                    if chunk.content:
+                        yield chunk.content
         except Exception as e:
             logger.error(f"스트리밍 응답 생성 중 오류: {e}")
             yield f"Error: {str(e)}"
     
-    async def stream_rag_response(self, question: str, use_advanced_chain: bool = False) -> AsyncGenerator[str, None]:
-        """RAG 체인을 사용한 스트리밍 응답"""
+    async def stream_rag_response(self, question: str, use_advanced_chain: bool = False,
+                                  search_filter: Optional[dict] = None, strict_filter: bool = False,
+                                  on_sources=None, timer: Optional[StageTimer] = None,
+                                  deadline: Optional[Deadline] = None) -> AsyncGenerator[str, None]:
+        """
+        RAG 스트리밍 응답.
+        검색 → rerank → (on_sources 콜백으로 근거 문서 전달) → 답변 토큰 스트리밍
+        """
         try:
-            chain = self.advanced_rag_chain if use_advanced_chain else self.rag_chain
-            
             if use_advanced_chain:
                 # 고급 체인의 경우 결과에서 answer 부분만 스트리밍
-                async for result in chain.astream(question):
-                    if isinstance(result, dict) and 'answer' in result:
-                        yield result['answer']
-                    elif isinstance(result, str):
-                        yield result
+                async with aclosing(self.advanced_rag_chain.astream(question)) as upstream:
+                    async for result in upstream:
+                        if isinstance(result, dict) and 'answer' in result:
+                            yield result['answer']
+                        elif isinstance(result, str):
+                            yield result
+                return
+
+            docs = await self.retrieve_documents(question, search_filter, strict_filter, timer, deadline)
+            if on_sources:
+                await on_sources(docs)
+            if deadline and not deadline.allows(config.FULL_CONTEXT_MIN_BUDGET_MS):
+                # 프롬프트가 짧을수록 첫 토큰이 빨리 나옴
+                deadline.degrade("context_reduced")
+                context = format_docs(docs, config.DEGRADED_CONTEXT_DOCS, config.DEGRADED_CONTEXT_CHARS)
             else:
-                # 기본 체인
-                async for chunk in chain.astream(question):
+                context = format_docs(docs)
+            async with aclosing(self.answer_chain.astream({"input": question, "context": context})) as upstream:
+                async for chunk in upstream:
                     if chunk:
                         yield chunk
-                        
+        
+        except ClientDisconnected:
+            raise
         except Exception as e:
             logger.error(f"RAG 스트리밍 응답 생성 중 오류: {e}")
             yield f"RAG 처리 중 오류가 발생했습니다: {str(e)}"
@@ -371,11 +833,49 @@ Answer:""",
 # 전역 LLMService 인스턴스
 llm_service = LLMService()
 
+def question_priority(question: str, priority: Optional[str] = None) -> str:
+    """질문 메시지의 priority 필드, 없으면 응급 관련 단어 포함 여부로 우선순위 결정"""
+    if priority:
+        return priority
+    lowered = question.lower()
+    if any(word in lowered for word in config.EMERGENCY_KEYWORDS):
+        return "emergency"
+    return "normal"
+
+async def answer_with_admission(question: str, websocket: WebSocket, client_id: str = None,
+                                filters: Optional[dict] = None, priority: Optional[str] = None,
+                                deadline: Optional[Deadline] = None, profile: bool = False,
+                                timer: Optional[StageTimer] = None):
+    """
+    입장 제어를 통과한 질문만 답변 생성. 거절되면 busy 메시지(retryAfter 초)로 즉시 응답.
+    deadline / timer는 수신 시점부터 흐르므로 대기열에서 기다린 시간만큼 이후 단계가 축소되고,
+    timings의 admitted 에 대기열 대기 시간이 드러난다.
+    """
+    timer = timer or StageTimer()
+    try:
+        async with admission.slot(client_id or str(id(websocket)), question_priority(question, priority)):
+            timer.mark("admitted")
+            return await llm_service.get_streaming_answer(
+                question, websocket, client_id, filters=filters, deadline=deadline, profile=profile,
+                timer=timer
+            )
+    except AdmissionRejected as e:
+        logger.warning(f"요청 거절 ({e.reason}) - 클라이언트: {client_id}, {e.retry_after}s 후 재시도")
+        try:
+            await llm_service._send_websocket_message(
+                websocket, client_id, "요청이 많아 잠시 후 다시 시도해주세요.", "busy",
+                {"reason": e.reason, "retryAfter": e.retry_after}
+            )
+        except ClientDisconnected:
+            pass
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 시작 시
     try:
         await llm_service.initialize()
+        loop_monitor.start()
+        llm_service.http_pool.start_prewarm(config.HTTP_PREWARM_URLS, config.HTTP_PREWARM_INTERVAL)
         logger.info("애플리케이션 시작 완료")
     except Exception as e:
         logger.error(f"애플리케이션 시작 실패: {e}")
@@ -384,6 +884,9 @@ async def lifespan(app: FastAPI):
     yield
     
     # 종료 시
+    await loop_monitor.stop()
+    if admin_profiler and admin_profiler.running:
+        admin_profiler.stop()
     await llm_service.close()
     logger.info("애플리케이션 종료 완료")
 
@@ -423,12 +926,40 @@ async def websocket_endpoint(websocket: WebSocket):
                     manager.update_client_id(websocket, old_key, new_client_id)
                     client_id = new_client_id
                 
-                # LLMService를 사용한 스트리밍 답변 생성
-                await llm_service.get_streaming_answer(question, websocket, client_id)
+                # 프로세스 전체 프로파일러를 돌리므로 관리자 토큰(adminToken)이 있을 때만 허용
+                profile = bool(message_data.get("profile"))
+                if profile and not is_admin_token(message_data.get("adminToken")):
+                    logger.warning(f"관리자 토큰 없는 profile 요청 무시 - 클라이언트 ID: {client_id}")
+                    profile = False
+                
+                # LLMService를 사용한 스트리밍 답변 생성 (filters 예: {"disease": "cholera"})
+                # 수신 루프가 막히지 않도록 Task로 실행 – 같은 clientId의 이전 답변은 취소됨
+                request_tracker.start(
+                    (websocket_id, client_id),
+                    answer_with_admission(
+                        question, websocket, client_id, filters=message_data.get("filters"),
+                        priority=message_data.get("priority"),
+                        deadline=Deadline(message_data.get("deadlineMs")),
+                        profile=profile,
+                        timer=StageTimer()
+                    )
+                )
+            elif message_data.get("type") == "cancel":
+                cancel_id = message_data.get("clientId") or client_id
+                cancelled = request_tracker.cancel((websocket_id, cancel_id), "cancelled")
+                logger.info(f"취소 요청 - 클라이언트 ID: {cancel_id}, 진행 중 작업 취소: {cancelled}")
+                await websocket.send_text(json.dumps({
+                    "type": "cancelled",
+                    "content": cancelled,
+                    "clientId": cancel_id,
+                }))
             else:
                 # 기존 방식 호환성 유지
                 question = message_data.get("content", "")
-                await llm_service.get_streaming_answer(question, websocket)
+                request_tracker.start(
+                    (websocket_id, None),
+                    answer_with_admission(question, websocket, deadline=Deadline(), timer=StageTimer())
+                )
                 
     except WebSocketDisconnect:
         logger.info(f"WebSocket 연결 끊어짐 - 클라이언트: {client_id}")
@@ -447,6 +978,10 @@ async def websocket_endpoint(websocket: WebSocket):
             except:
                 pass
     finally:
+        # 이 연결로 진행 중인 답변 생성은 모두 취소 (업스트림 토큰 낭비 방지)
+        cancelled = request_tracker.cancel_all(websocket_id, "disconnected")
+        if cancelled:
+            logger.info(f"연결 종료로 진행 중 답변 {cancelled}건 취소: {websocket_id}")
         # 연결 정리
         if client_id:
             manager.disconnect(websocket, client_id)
@@ -454,6 +989,98 @@ async def websocket_endpoint(websocket: WebSocket):
             del manager.active_connections[websocket_id]
             logger.info(f"WebSocket 연결 정리됨: {websocket_id}")
 
+class BatchQuestion(BaseModel):
+    id: Optional[str] = None
+    question: str
+    filters: Optional[dict] = None
+
+class BatchRequest(BaseModel):
+    questions: List[BatchQuestion]
+
+@app.post("/batch")
+async def batch_questions(body: BatchRequest, request: Request):
+    """
+    여러 질문을 한 번에 처리 (프로토콜 검토, FAQ 갱신 등).
+    결과는 답변이 끝나는 순서대로 NDJSON 한 줄씩 스트리밍되고, 마지막 줄은 summary.
+    동시에 돌리는 답변 생성 수만큼 (min(질문 수, BATCH_CONCURRENCY)) low 우선순위 입장 슬롯을 사용한다.
+    """
+    if not body.questions:
+        raise HTTPException(status_code=400, detail="questions가 비어 있습니다.")
+    if len(body.questions) > config.BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=413,
+                            detail=f"질문은 최대 {config.BATCH_MAX_QUESTIONS}개까지 보낼 수 있습니다.")
+    items = [
+        {"id": q.id or str(i), "question": q.question, "filters": q.filters}
+        for i, q in enumerate(body.questions)
+    ]
+    client_key = f"batch:{request.client.host if request.client else 'unknown'}"
+    slots = min(len(items), config.BATCH_CONCURRENCY, admission.max_inflight)
+    try:
+        await admission.acquire(client_key, "low", slots=slots)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=503, detail=f"요청이 많습니다 ({e.reason}).",
+                            headers={"Retry-After": str(int(e.retry_after + 0.99))})
+
+    async def stream():
+        try:
+            async for result in llm_service.answer_batch(items, concurrency=slots):
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"배치 처리 오류: {e}")
+            yield json.dumps({"type": "error", "error": str(e)}, ensure_ascii=False) + "\n"
+        finally:
+            admission.release(slots)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+# ────── 관리자 프로파일링 ─────────────────────────────────────
+admin_profiler: Optional[SamplingProfiler] = None
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """X-Admin-Token 헤더가 config ADMIN_TOKEN과 일치해야 함 (토큰 미설정 시 비활성)"""
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="관리자 토큰이 필요합니다.")
+
+@app.post("/admin/profile/start", dependencies=[Depends(require_admin)])
+async def start_profile(seconds: int = 30):
+    """샘플링 프로파일러를 seconds초 동안 실행 (최대 PROFILE_MAX_SECONDS)"""
+    global admin_profiler
+    if admin_profiler and admin_profiler.running:
+        raise HTTPException(status_code=409, detail="프로파일러가 이미 실행 중입니다.")
+    seconds = max(1, min(seconds, config.PROFILE_MAX_SECONDS))
+    admin_profiler = SamplingProfiler(config.PROFILE_INTERVAL)
+    admin_profiler.start(seconds)
+    logger.info(f"관리자 프로파일링 시작 ({seconds}s)")
+    return {"status": "started", "seconds": seconds}
+
+@app.post("/admin/profile/stop", dependencies=[Depends(require_admin)])
+async def stop_profile():
+    """프로파일러를 멈추고(이미 끝났으면 그대로) 결과를 저장. 다운로드용 이름 반환"""
+    global admin_profiler
+    if admin_profiler is None:
+        raise HTTPException(status_code=404, detail="실행한 프로파일러가 없습니다.")
+    profiler, admin_profiler = admin_profiler, None
+    name = await asyncio.to_thread(save_profile, profiler, "admin")
+    return {"status": "stopped", "profile": name, "samples": profiler.samples}
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """저장된 프로파일 목록과 이벤트 루프 지연 통계"""
+    names = sorted(os.listdir(config.PROFILE_DIR)) if os.path.isdir(config.PROFILE_DIR) else []
+    return {
+        "running": bool(admin_profiler and admin_profiler.running),
+        "profiles": names,
+        "loop_lag": loop_monitor.snapshot(),
+    }
+
+@app.get("/admin/profile/{name}", dependencies=[Depends(require_admin)])
+async def download_profile(name: str):
+    """folded stack 다운로드 (flamegraph.pl, speedscope 에서 열기)"""
+    path = os.path.join(config.PROFILE_DIR, os.path.basename(name))
+    if not name.endswith(".folded") or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="프로파일을 찾을 수 없습니다.")
+    return FileResponse(path, media_type="text/plain", filename=os.path.basename(name))
+
 @app.get("/health")
 async def health_check():
     """서버 상태 확인 엔드포인트"""
@@ -468,7 +1095,11 @@ async def health_check():
         return {
             "status": "healthy", 
             "message": "LLMService 스트리밍 서버가 정상 작동 중입니다.",
-            "active_connections": len(manager.active_connections)
+            "active_connections": len(manager.active_connections),
+            "requests": request_tracker.snapshot(),
+            "admission": admission.snapshot(),
+            "loop_lag": loop_monitor.snapshot(),
+            "http_pool": llm_service.http_pool.snapshot() if llm_service.http_pool else None
         }
     except Exception as e:
         logger.error(f"Health check 실패: {e}")
@@ -0,0 +1,168 @@
+"""
+profiling.py
+────────────────────────────────────────────────────────────────
+이벤트 루프 지연 감시 + 샘플링 프로파일러 (표준 라이브러리만 사용).
+• LoopLagMonitor  : 루프 안의 heartbeat가 threshold 이상 밀리면, 감시 스레드가
+                    그 순간 루프 스레드의 스택(= 루프를 막고 있는 동기 코드)을 로그로 남김
+                    (예: HuggingFaceCrossEncoder 추론, 동기 retriever 호출)
+• SamplingProfiler: 일정 간격으로 sys._current_frames()를 샘플링해
+                    flamegraph.pl / speedscope 에서 바로 열 수 있는 folded stack 텍스트 생성
+main.py 의 /admin/profile 엔드포인트와 질문 메시지의 profile 플래그에서 사용.
+────────────────────────────────────────────────────────────────
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import Counter, deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _fold(frame) -> str:
+    """frame → 'a.py:main;b.py:handler;c.py:score' (바깥 → 안쪽)"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class LoopLagMonitor:
+    """
+    루프에서 interval마다 heartbeat를 찍고, 별도 스레드가 heartbeat 공백을 감시.
+    공백이 threshold_ms를 넘으면 루프가 막힌 것이므로 그 시점의 루프 스레드 스택을 기록한다.
+    """
+
+    def __init__(self, threshold_ms: float = 200, interval: float = 0.05, keep: int = 20):
+        self.threshold = threshold_ms / 1000
+        self.interval  = interval
+        self.last_beat = time.monotonic()
+        self.loop_thread_id: Optional[int] = None
+        self.stalls    = deque(maxlen=keep)     # 최근 감지된 블로킹 (스택 포함)
+        self.stats     = {"stalls": 0, "max_lag_ms": 0.0, "last_lag_ms": 0.0}
+        self._task     = None
+        self._stop     = threading.Event()
+        self._watchdog = None
+
+    def start(self):
+        """실행 중인 이벤트 루프 안에서 호출"""
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _heartbeat(self):
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag_ms = max(0.0, (now - before - self.interval) * 1000)
+            self.stats["last_lag_ms"] = round(lag_ms, 1)
+            self.stats["max_lag_ms"] = max(self.stats["max_lag_ms"], round(lag_ms, 1))
+            self.last_beat = now
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stop.wait(self.interval / 2):
+            beat = self.last_beat
+            blocked = time.monotonic() - beat
+            if blocked < self.threshold or beat == reported_beat:
+                continue
+            # 같은 정지 구간은 한 번만 기록
+            reported_beat = beat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(스택 없음)"
+            self.stats["stalls"] += 1
+            self.stalls.append({
+                "at": time.time(),
+                "blocked_ms": round(blocked * 1000, 1),
+                "stack": stack,
+            })
+            logger.warning(f"이벤트 루프가 {blocked * 1000:.0f}ms 이상 막힘 – 루프 스레드 스택:\n{stack}")
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "threshold_ms": self.threshold * 1000,
+                "recent_stalls": [{k: v for k, v in s.items() if k != "stack"} for s in self.stalls]}
+
+
+class SamplingProfiler:
+    """
+    interval초마다 모든 스레드(자기 자신 제외)의 스택을 샘플링해 folded stack으로 집계.
+    thread_ids를 주면 그 스레드만 샘플링한다. 요청 단위로 돌려도 같은 시간에 실행된
+    다른 요청의 스택이 함께 잡히는 프로세스 전체 프로파일이다.
+    duration을 주면 그 시간이 지나면 스스로 멈춘다.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_ids=None):
+        self.interval   = interval
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.counts     = Counter()
+        self.samples    = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._stop      = threading.Event()
+        self._thread    = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: Optional[float] = None):
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(duration,),
+                                        name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        """샘플링을 멈추고 folded stack 텍스트 반환"""
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.stopped_at = self.stopped_at or time.time()
+        return self.folded()
+
+    def _run(self, duration: Optional[float]):
+        me = threading.get_ident()
+        deadline = time.monotonic() + duration if duration else None
+        while not self._stop.wait(self.interval):
+            if deadline and time.monotonic() >= deadline:
+                break
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me or (self.thread_ids and thread_id not in self.thread_ids):
+                    continue
+                self.counts[_fold(frame)] += 1
+            self.samples += 1
+        self.stopped_at = time.time()
+
+    def folded(self) -> str:
+        """flamegraph.pl 입력 형식: '스택 샘플수' 한 줄씩"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.counts.most_common()) + "\n"
+
+    def save(self, directory: str, name: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.folded())
+        return path
@@ -0,0 +1,98 @@
+"""
+retrieval.py
+────────────────────────────────────────────────────────────────
+검색 필터 / 컨텍스트 포맷팅 순수 함수 (LLM·Pinecone 클라이언트 없이 동작).
+• resolve_filters : 질문 메시지의 filters 또는 질문 내용 → Pinecone 메타데이터 필터
+• format_docs     : 검색/rerank 결과 → 답변 프롬프트 컨텍스트 문자열
+main.py(LLMService)와 evaluate.py(오프라인 평가)가 같은 규칙을 쓰도록 여기에 둔다.
+────────────────────────────────────────────────────────────────
+"""
+import re
+import logging
+from typing import Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+def alias_pattern(words) -> re.Pattern:
+    """별칭과 단어 단위로 일치하는 패턴 (crawler/tags.py 와 같은 규칙, 한글 별칭은 조사 허용)"""
+    parts = [re.escape(w) + (r"\b" if w[-1].isascii() else "")
+             for w in sorted(words, key=len, reverse=True)]
+    return re.compile(r"\b(?:" + "|".join(parts) + ")")
+
+
+DISEASE_PATTERNS = {name: alias_pattern(aliases) for name, aliases in config.DISEASE_ALIASES.items()}
+
+
+def canonical_filter_values(field: str, values: list) -> list:
+    """명시 필터 값 → 메타데이터 표준 이름. 별칭 사전에 없는 값은 경고 후 버림"""
+    vocabulary = config.FILTER_ALIASES.get(field, {})
+    canonical = []
+    for value in values:
+        lowered = str(value).strip().lower()
+        name = lowered.replace(" ", "_")
+        if name not in vocabulary:
+            name = next((n for n, aliases in vocabulary.items() if lowered in aliases), None)
+        if name is None:
+            logger.warning(f"알 수 없는 {field} 필터 값 무시: {value!r}")
+        elif name not in canonical:
+            canonical.append(name)
+    return canonical
+
+
+def resolve_filters(question: str, filters: Optional[dict] = None):
+    """
+    질문 메시지의 filters (예: {"disease": "cholera"}) 또는 질문 내용에서
+    Pinecone 메타데이터 필터 생성. (필터, 명시 여부) 반환
+    • 명시 값은 별칭 사전으로 표준 이름으로 바꾸고 ("Hepatitis A" → hepatitis_a), 모르는 값은 버림
+    • 질문에서 추론한 질병 필터는 태그가 없는 예전 벡터도 함께 통과시킴 ($exists: false)
+    """
+    if filters and not isinstance(filters, dict):
+        logger.warning(f"filters는 객체여야 함, 무시: {filters!r}")
+        filters = None
+
+    conditions = {}
+    for key, value in (filters or {}).items():
+        field = config.FILTER_FIELDS.get(key)
+        if not field or not value:
+            continue
+        if isinstance(value, str):
+            value = [value]
+        elif not isinstance(value, list):
+            logger.warning(f"{key} 필터 값은 문자열 또는 목록이어야 함, 무시: {value!r}")
+            continue
+        values = canonical_filter_values(field, [v for v in value if isinstance(v, str)])
+        if values:
+            conditions[field] = {"$in": values}
+    explicit = bool(conditions)
+
+    if "diseases" not in conditions:
+        lowered = question.lower()
+        inferred = [name for name, pattern in DISEASE_PATTERNS.items() if pattern.search(lowered)]
+        if inferred:
+            conditions["$or"] = [
+                {"diseases": {"$in": inferred}},
+                {"diseases": {"$exists": False}},
+            ]
+
+    return (conditions or None), explicit
+
+
+def format_docs(docs, max_docs: int = 5, max_chars: Optional[int] = None) -> str:
+    """문서들을 컨텍스트 문자열로 포맷팅 (max_chars: 문서별 본문 길이 제한)"""
+    if not docs:
+        return "관련 문서를 찾을 수 없습니다."
+
+    formatted_docs = []
+    for i, doc in enumerate(docs[:max_docs], 1):
+        # reranker score가 있다면 표시
+        score_info = ""
+        if hasattr(doc, 'metadata') and 'relevance_score' in doc.metadata:
+            score_info = f" (관련도: {doc.metadata['relevance_score']:.3f})"
+
+        content = doc.page_content[:max_chars] if max_chars else doc.page_content
+        formatted_docs.append(f"[문서 {i}{score_info}]\n{content}")
+
+    return "\n\n".join(formatted_docs)